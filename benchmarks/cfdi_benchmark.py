@@ -0,0 +1,57 @@
+"""
+Benchmark de parseo de CFDI (smart_xml_extraction).
+
+Uso:
+    python -m benchmarks.cfdi_benchmark --files 20000 --workers 1 2 4 auto
+
+Genera CFDI 3.3/4.0 sintéticos en una carpeta temporal y mide el throughput
+(archivos/s) de FACTURAS.parse_xml_files con hilos (xml_workers: 1) y con el
+pool de procesos para cada número de procesos indicado.
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+BASE_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if BASE_PATH not in sys.path:
+    sys.path.insert(0, BASE_PATH)
+
+from modules.facturas import FACTURAS  # noqa: E402
+from benchmarks.synthetic_data import SyntheticData  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de parseo de CFDI")
+    parser.add_argument("--files", type=int, default=20_000)
+    parser.add_argument("--workers", nargs="+", default=["1", "auto"],
+                        help="Valores de xml_workers a medir (1 = hilos)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as working_folder:
+        xml_folder = os.path.join(working_folder, "xmls")
+        start = time.perf_counter()
+        paths = SyntheticData(0, seed=args.seed).write_cfdi_folder(xml_folder, args.files)
+        print(f"📝 {len(paths)} CFDI generados en {time.perf_counter() - start:.1f}s")
+        xml_files = [(p, os.path.basename(p)) for p in paths]
+
+        baseline = None
+        for workers in args.workers:
+            facturas = FACTURAS(working_folder, {"xml_workers": workers}, helpers=None)
+            start = time.perf_counter()
+            rows = 0
+            errors = 0
+            for _, _, (status, _, _, result) in facturas.parse_xml_files(xml_files):
+                rows += len(result)
+                errors += status != 'procesado'
+            seconds = time.perf_counter() - start
+            throughput = len(xml_files) / seconds
+            baseline = baseline or throughput
+            print(f"⏱️ xml_workers={workers:>4}: {seconds:7.2f}s, {throughput:9.0f} archivos/s, "
+                  f"{rows} conceptos, {errors} con error, x{throughput / baseline:.2f} vs primera medición")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Benchmark de motores de lectura de Excel (ExcelReader).
+
+Uso:
+    python -m benchmarks.excel_engine_benchmark --orders 50000 --engines openpyxl calamine
+
+Escribe libros sintéticos con la forma de los reales (Camunda, SAGI, catálogo
+PAQS con df_facturas/df_pagos, penas con filas de título y un catálogo PAQS
+ancho) y mide la lectura de cada hoja con cada motor. También indica si el
+DataFrame leído es idéntico al de openpyxl.
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+import numpy as np
+import pandas as pd
+
+BASE_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if BASE_PATH not in sys.path:
+    sys.path.insert(0, BASE_PATH)
+
+from modules.excel_io import ExcelReader  # noqa: E402
+from benchmarks.synthetic_data import SyntheticData  # noqa: E402
+from benchmarks.load_and_concat_benchmark import write_catalog  # noqa: E402
+
+
+def workbook_shapes(working_folder, n_orders, seed):
+    """[(etiqueta, ruta, hoja, kwargs)] de los libros escritos."""
+    synthetic = SyntheticData(n_orders, seed=seed)
+    synthetic.write_working_folder(working_folder, timestamp="2025-01-01-08")
+    wide = os.path.join(working_folder, "PAQS_ancho.xlsx")
+    write_catalog(wide, n_orders // 2, 80, title_rows=4, rng=np.random.default_rng(seed))
+    return [
+        ("Camunda", os.path.join(working_folder, "Camunda", "2025-01-01-08h CAMUNDA.xlsx"), 0, {}),
+        ("SAGI", os.path.join(working_folder, "SAGI", "2025-01-01-08h SAGI.xlsx"), 0, {}),
+        ("PAQS df_facturas", os.path.join(working_folder, "Facturas", "2025-01-01-08h_PAQS_INSABI.xlsx"), "df_facturas", {}),
+        ("PAQS df_pagos", os.path.join(working_folder, "Facturas", "2025-01-01-08h_PAQS_INSABI.xlsx"), "df_pagos", {}),
+        ("Penas", os.path.join(working_folder, "Penas", "penas_convencionales.xlsx"), "PENAS", {"skiprows": 2}),
+        ("PAQS ancho (80 cols)", wide, "PAQS", {"skiprows": 4}),
+        ("Camunda dtype=str", os.path.join(working_folder, "Camunda", "2025-01-01-08h CAMUNDA.xlsx"), 0, {"dtype": str}),
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de motores de lectura de Excel")
+    parser.add_argument("--orders", type=int, default=20_000)
+    parser.add_argument("--engines", nargs="+", default=["openpyxl", "calamine"])
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    engines = []
+    for engine in args.engines:
+        if engine == "calamine" and not ExcelReader.calamine_available():
+            print("⚠️ python-calamine no está instalado, se omite calamine")
+            continue
+        engines.append(engine)
+
+    with tempfile.TemporaryDirectory() as working_folder:
+        start = time.perf_counter()
+        shapes = workbook_shapes(working_folder, args.orders, args.seed)
+        print(f"📝 Libros sintéticos escritos en {time.perf_counter() - start:.1f}s")
+
+        rows = []
+        for label, path, sheet, kwargs in shapes:
+            reference = None
+            for engine in engines:
+                reader = ExcelReader(engine)
+                start = time.perf_counter()
+                df = reader.read_excel(path, sheet_name=sheet, **kwargs)
+                seconds = time.perf_counter() - start
+                if reference is None:
+                    reference = df
+                try:
+                    pd.testing.assert_frame_equal(reference, df)
+                    same = "sí"
+                except AssertionError:
+                    try:
+                        pd.testing.assert_frame_equal(reference, df, check_dtype=False)
+                        same = "valores sí, tipos no"
+                    except AssertionError:
+                        same = "no"
+                rows.append({"libro": label, "filas": len(df), "columnas": df.shape[1], "motor": engine,
+                             "segundos": round(seconds, 3), f"igual a {engines[0]}": same})
+
+        report = pd.DataFrame(rows)
+        with pd.option_context("display.width", 200, "display.max_rows", None):
+            print(report.to_string(index=False))
+            totals = report.groupby("motor")["segundos"].sum().reindex(engines)
+            print("\n⏱️ Total por motor:")
+            for engine, seconds in totals.items():
+                print(f"   {engine}: {seconds:.2f}s (x{totals.iloc[0] / seconds:.2f} vs {engines[0]})")
+
+
+if __name__ == "__main__":
+    main()
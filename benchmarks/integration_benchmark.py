@@ -0,0 +1,221 @@
+"""
+Benchmark de la etapa de integración con datos sintéticos.
+
+Uso:
+    python -m benchmarks.integration_benchmark --rows 10000 100000 1000000
+    python -m benchmarks.integration_benchmark --rows 5000000 --save-max-rows 0
+
+Mide clean_invoice_df, clean_accounts_df, cada populate_df de join_orders y
+save_if_modified, y agrega los resultados a benchmarks/results/integration.csv
+junto con el commit actual para comparar entre versiones.
+
+Con --partitions N además corre integrar_insumos completo en modo en memoria y
+en modo particionado (N particiones), cada uno en un proceso nuevo, y reporta
+el tiempo, el pico de RSS sobre el inicio (peak_rss_mb) y si ambos resultados
+son idénticos:
+    python -m benchmarks.integration_benchmark --rows 400000 --partitions 16
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+import datetime
+import subprocess
+import contextlib
+import concurrent.futures
+import io
+import pandas as pd
+
+BASE_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if BASE_PATH not in sys.path:
+    sys.path.insert(0, BASE_PATH)
+
+from modules.data_integration import DataIntegration  # noqa: E402
+from modules.excel_io import MemoryPeak  # noqa: E402
+from benchmarks.synthetic_data import SyntheticData  # noqa: E402
+
+RESULTS_FILE = os.path.join(os.path.dirname(__file__), "results", "integration.csv")
+
+
+def current_commit():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BASE_PATH, stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except Exception:
+        return "unknown"
+
+
+@contextlib.contextmanager
+def quiet(enabled=True):
+    # La integración imprime mucho; se silencia para que no afecte los tiempos
+    if not enabled:
+        yield
+        return
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
+
+
+def run_scale(n_orders, seed, save_max_rows, config, verbose=False):
+    data = SyntheticData(n_orders, seed=seed).generate()
+    results = []
+
+    with tempfile.TemporaryDirectory() as working_folder:
+        integration_path = os.path.join(working_folder, "Integración")
+        os.makedirs(integration_path, exist_ok=True)
+        integration = DataIntegration(working_folder, config, integration_path)
+
+        order_df = data["orders"].copy()
+        order_df["Importe"] = order_df["precio_unitario"].astype(float) * order_df["cantidad_solicitada"].astype(float)
+        integration.order_df = order_df
+
+        def timed(stage, func, *args, rows=None):
+            start = time.perf_counter()
+            with quiet(not verbose):
+                out = func(*args)
+            results.append({"stage": stage, "seconds": time.perf_counter() - start, "rows": rows})
+            return out
+
+        invoice_df = timed("clean_invoice_df", integration.clean_invoice_df, data["invoices"].copy(),
+                           rows=len(data["invoices"]))
+        accounts_df = timed("clean_accounts_df", integration.clean_accounts_df, data["sagi"].copy(), invoice_df,
+                            rows=len(data["sagi"]))
+
+        integration.join_metrics = []
+        order_df = timed("join_orders", integration.join_orders, integration.order_df, invoice_df, accounts_df,
+                         data["penalties"], rows=len(order_df))
+        # Cada populate_df ya registra su duración en join_metrics (user-033)
+        for join in integration.join_metrics:
+            results.append({
+                "stage": f"populate_df[{join['left_keys']}->{join['right_keys']}]",
+                "seconds": join["duration_s"],
+                "rows": join["left_rows"],
+                "match_rate": join["match_rate"],
+            })
+
+        if save_max_rows and len(order_df) <= save_max_rows:
+            output_file = os.path.join(integration_path, "benchmark_Integracion INSABI.xlsx")
+            timed("save_if_modified", integration.save_if_modified, output_file, {
+                "CAMUNDA": order_df, "SAGI": accounts_df, "FACTURAS": invoice_df, "PAGOS": data["payments"],
+            }, rows=len(order_df))
+        else:
+            print(f"   ⏩ save_if_modified omitido para {n_orders} filas (--save-max-rows={save_max_rows})")
+
+    for r in results:
+        r["n_orders"] = n_orders
+    return results
+
+
+def run_mode(n_orders, seed, config, n_partitions, verbose=False):
+    """
+    integrar_insumos de punta a punta en este proceso (se llama en un proceso
+    nuevo por modo para que el pico de RSS no se contamine entre corridas).
+    """
+    data = SyntheticData(n_orders, seed=seed).generate()
+    config = dict(config, integration_partitions=n_partitions)
+    with tempfile.TemporaryDirectory() as working_folder:
+        integration_path = os.path.join(working_folder, "Integración")
+        os.makedirs(integration_path, exist_ok=True)
+        integration = DataIntegration(working_folder, config, integration_path)
+        order_df = data.pop("orders")
+        order_df["Importe"] = order_df["precio_unitario"].astype(float) * order_df["cantidad_solicitada"].astype(float)
+        integration.order_df = order_df
+        # Mismo traspaso de insumos que integrar_grupo: el método los suelta al terminar de usarlos
+        inputs = {"invoices": data.pop("invoices"), "accounts": data.pop("sagi")}
+        penalties_df = data.pop("penalties")
+        del data, order_df
+
+        start = time.perf_counter()
+        with MemoryPeak("rss") as memory, quiet(not verbose):
+            order_df, invoice_df, accounts_df = integration.integrar_insumos(inputs, penalties_df, n_partitions)
+        seconds = time.perf_counter() - start
+        digest = int(pd.util.hash_pandas_object(order_df, index=False).sum())
+
+    mode = f"partitioned={n_partitions}" if n_partitions > 1 else "memory"
+    return {
+        "stage": f"integrar_insumos[{mode}]",
+        "seconds": seconds,
+        "rows": len(order_df),
+        "peak_rss_mb": round(memory.peak_mb, 1) if memory.peak_mb is not None else None,
+        "output_hash": digest,
+    }
+
+
+def compare_modes(n_orders, seed, config, n_partitions, verbose=False):
+    results = []
+    for partitions in (0, n_partitions):
+        with concurrent.futures.ProcessPoolExecutor(max_workers=1) as executor:
+            results.append(executor.submit(run_mode, n_orders, seed, config, partitions, verbose).result())
+    identical = results[0]["output_hash"] == results[1]["output_hash"]
+    print(f"   🧠 Pico de RSS: memoria +{results[0]['peak_rss_mb']} MB, "
+          f"particionado ({n_partitions}) +{results[1]['peak_rss_mb']} MB; "
+          f"resultados {'idénticos' if identical else 'DISTINTOS'}")
+    for r in results:
+        r.pop("output_hash")
+        r["n_orders"] = n_orders
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark sintético de DataIntegration")
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000],
+                        help="Número de órdenes por escala (p. ej. 10000 100000 5000000)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--save-max-rows", type=int, default=200_000,
+                        help="Escalas mayores omiten save_if_modified (0 = nunca guardar)")
+    parser.add_argument("--normalize-keys", choices=["yes", "no"], default="no",
+                        help="integration_key_normalization (desactivado por defecto, como en config.yaml)")
+    parser.add_argument("--key-codes", action="store_true")
+    parser.add_argument("--partitions", type=int, default=0,
+                        help="Compara pico de RSS y tiempo del modo en memoria contra N particiones")
+    parser.add_argument("--label", default="", help="Etiqueta libre para identificar la corrida")
+    parser.add_argument("--verbose", action="store_true", help="Muestra la salida de la integración")
+    args = parser.parse_args()
+
+    config = {
+        "integration_key_normalization": args.normalize_keys == "yes",
+        "integration_key_codes": args.key_codes,
+    }
+    run_at = datetime.datetime.now().isoformat(timespec="seconds")
+    commit = current_commit()
+
+    all_results = []
+    for n in args.rows:
+        print(f"🏁 Escala {n:,} órdenes...")
+        all_results.extend(run_scale(n, args.seed, args.save_max_rows, config, args.verbose))
+        if args.partitions > 1:
+            all_results.extend(compare_modes(n, args.seed, config, args.partitions, args.verbose))
+
+    df = pd.DataFrame(all_results)
+    df.insert(0, "run_at", run_at)
+    df.insert(1, "commit", commit)
+    df.insert(2, "label", args.label)
+    df["key_normalization"] = config["integration_key_normalization"]
+    df["key_codes"] = config["integration_key_codes"]
+
+    # Comparación contra la corrida previa registrada para la misma escala y etapa
+    previous = pd.read_csv(RESULTS_FILE) if os.path.exists(RESULTS_FILE) else pd.DataFrame()
+    if not previous.empty:
+        last = (previous.sort_values("run_at")
+                .groupby(["n_orders", "stage"], as_index=False).last()[["n_orders", "stage", "commit", "seconds"]]
+                .rename(columns={"commit": "prev_commit", "seconds": "prev_seconds"}))
+        report = df.merge(last, on=["n_orders", "stage"], how="left")
+        report["speedup"] = (report["prev_seconds"] / report["seconds"]).round(2)
+    else:
+        report = df
+
+    with pd.option_context("display.max_rows", None, "display.width", 200):
+        cols = [c for c in ["n_orders", "stage", "rows", "seconds", "peak_rss_mb", "match_rate",
+                            "prev_commit", "prev_seconds", "speedup"]
+                if c in report.columns]
+        print(report[cols].round(4).to_string(index=False))
+
+    os.makedirs(os.path.dirname(RESULTS_FILE), exist_ok=True)
+    # Se reescribe completo para que las columnas nuevas (p. ej. peak_rss_mb) queden alineadas
+    pd.concat([previous, df], ignore_index=True).to_csv(RESULTS_FILE, index=False)
+    print(f"\n💾 Resultados agregados a {RESULTS_FILE}")
+
+
+if __name__ == "__main__":
+    main()
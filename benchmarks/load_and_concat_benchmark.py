@@ -0,0 +1,122 @@
+"""
+Benchmark de HELPERS.load_and_concat contra la versión anterior (11 lecturas
+de encabezado por libro y lectura de todas las columnas).
+
+Uso:
+    python -m benchmarks.load_and_concat_benchmark --rows 20000 --columns 80 --files 3
+
+Genera catálogos PAQS anchos con filas de título antes del encabezado, carga
+la sección con ambas versiones, verifica que el resultado sea idéntico y
+reporta los tiempos.
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+import numpy as np
+import pandas as pd
+
+BASE_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if BASE_PATH not in sys.path:
+    sys.path.insert(0, BASE_PATH)
+
+from modules.helpers import HELPERS  # noqa: E402
+
+REQUESTED = ["Referencia", "Factura", "UUID", "Folio", "UUID Descripción", "Total", "Fecha"]
+
+
+def legacy_load_and_concat(config_section):
+    """Versión anterior de load_and_concat (sin mensajes), como referencia."""
+    dfs, standard_cols, original_names = [], None, None
+    for name, cfg in config_section.items():
+        file_path, sheet, rows = cfg.get("file_path"), cfg.get("sheet"), cfg.get("rows")
+        df = None
+        for skip in range(11):
+            try:
+                temp_df = pd.read_excel(file_path, sheet_name=sheet, skiprows=skip, nrows=0)
+                if all(col in temp_df.columns for col in rows):
+                    df = pd.read_excel(file_path, sheet_name=sheet, skiprows=skip)
+                    break
+            except Exception:
+                continue
+        else:
+            df = pd.read_excel(file_path, sheet_name=sheet)
+        if rows:
+            df = df[[col for col in rows if col in df.columns]]
+        if standard_cols is None:
+            standard_cols = [f"col_{i}" for i in range(len(df.columns))]
+            original_names = df.columns.tolist()
+        df.columns = standard_cols[:len(df.columns)]
+        dfs.append(df)
+    final_df = pd.concat(dfs, ignore_index=True)
+    final_df.columns = original_names
+    return final_df
+
+
+def write_catalog(path, n_rows, n_columns, title_rows, rng):
+    extra = [f"Campo {i}" for i in range(n_columns - len(REQUESTED))]
+    columns = extra[:5] + REQUESTED + extra[5:]
+    data = {}
+    for col in columns:
+        if col == "Total":
+            data[col] = rng.random(n_rows) * 10_000
+        elif col == "Fecha":
+            data[col] = pd.Timestamp("2024-01-01") + pd.to_timedelta(rng.integers(0, 365, n_rows), unit="D")
+        elif col.startswith("Campo") and int(col.split()[1]) % 3 == 0:
+            data[col] = rng.integers(0, 1_000, n_rows)
+        else:
+            data[col] = [f"{col[:3]}-{v}" for v in rng.integers(0, 100_000, n_rows)]
+    df = pd.DataFrame(data)
+    with pd.ExcelWriter(path) as writer:
+        pd.DataFrame([["CATÁLOGO PAQS"]] + [[None]] * (title_rows - 1)).to_excel(
+            writer, sheet_name="PAQS", index=False, header=False)
+        df.to_excel(writer, sheet_name="PAQS", index=False, startrow=title_rows)
+
+
+def timed(func, *args, repeat=1):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        out = func(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return out, best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de load_and_concat")
+    parser.add_argument("--rows", type=int, default=20_000, help="Filas por libro")
+    parser.add_argument("--columns", type=int, default=80, help="Columnas por libro")
+    parser.add_argument("--files", type=int, default=3, help="Libros en la sección")
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    with tempfile.TemporaryDirectory() as folder:
+        section = {}
+        for i in range(args.files):
+            path = os.path.join(folder, f"PAQS_{i}.xlsx")
+            # El encabezado cae en filas distintas según el libro, como en los catálogos reales
+            write_catalog(path, args.rows, args.columns, title_rows=1 + (i * 3) % 9, rng=rng)
+            section[f"paqs_{i}"] = {"file_path": path, "sheet": "PAQS", "rows": REQUESTED}
+        print(f"📝 {args.files} libros de {args.rows} filas × {args.columns} columnas")
+
+        legacy_df, legacy_s = timed(legacy_load_and_concat, section, repeat=args.repeat)
+        helpers = HELPERS()
+        with open(os.devnull, "w") as devnull:
+            stdout, sys.stdout = sys.stdout, devnull
+            try:
+                new_df, new_s = timed(helpers.load_and_concat, section, repeat=args.repeat)
+            finally:
+                sys.stdout = stdout
+
+        pd.testing.assert_frame_equal(legacy_df, new_df)
+        print(f"⏱️ Versión anterior: {legacy_s:.2f}s")
+        print(f"⏱️ Versión actual:   {new_s:.2f}s  (x{legacy_s / new_s:.2f})")
+        print(f"✅ Resultados idénticos: {new_df.shape[0]} filas × {new_df.shape[1]} columnas")
+
+
+if __name__ == "__main__":
+    main()
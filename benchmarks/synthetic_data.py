@@ -0,0 +1,190 @@
+import os
+import numpy as np
+import pandas as pd
+
+
+# Límite de filas de una hoja de Excel (sin contar el encabezado)
+EXCEL_MAX_ROWS = 1_048_575
+
+
+class SyntheticData:
+    """
+    Genera insumos sintéticos con la forma de las exportaciones reales:
+    órdenes de Camunda, catálogo de facturas (df_facturas / df_pagos),
+    exportación de SAGI y libro de penas convencionales.
+
+    Las proporciones (facturas canceladas, órdenes sin factura, SAGI sin orden,
+    espacios en las llaves, etc.) se pueden ajustar para reproducir casos reales.
+    """
+
+    def __init__(self, n_orders, seed=0, invoice_coverage=0.9, cancelled_rate=0.03,
+                 sagi_coverage=0.8, sagi_missing_order=0.05, penalty_rate=0.1, whitespace_rate=0.05):
+        self.n_orders = int(n_orders)
+        self.rng = np.random.default_rng(seed)
+        self.invoice_coverage = invoice_coverage
+        self.cancelled_rate = cancelled_rate
+        self.sagi_coverage = sagi_coverage
+        self.sagi_missing_order = sagi_missing_order
+        self.penalty_rate = penalty_rate
+        self.whitespace_rate = whitespace_rate
+
+    def _dates(self, n, start="2023-01-01", days=900):
+        offsets = self.rng.integers(0, days, n)
+        return pd.Timestamp(start) + pd.to_timedelta(offsets, unit="D")
+
+    def _with_whitespace(self, keys):
+        # Ruido típico de captura manual: espacios al inicio/fin o intermedios
+        noisy = self.rng.random(len(keys)) < self.whitespace_rate
+        keys = keys.copy()
+        keys[noisy] = " " + keys[noisy].str.replace("-", "- ", n=1, regex=False) + " "
+        return keys
+
+    def orders(self):
+        n = self.n_orders
+        ids = pd.Series(np.arange(n) + 23_000_000).astype(str)
+        months = pd.Series(self.rng.integers(1, 13, n)).astype(str).str.zfill(2)
+        years = pd.Series(self.rng.integers(2023, 2026, n)).astype(str)
+        suffix = pd.Series(self.rng.integers(1, 40, n)).astype(str).str.zfill(3)
+        autorizacion = self._dates(n)
+        return pd.DataFrame({
+            "numero_orden_suministro": "IMB-23-" + months + "-" + years + "-" + ids + "-U" + suffix,
+            "numero_contrato": "CS-" + pd.Series(self.rng.integers(1, 60, n)).astype(str).str.zfill(4),
+            "rfc_proveedor": "PRO" + pd.Series(self.rng.integers(100000, 999999, n)).astype(str),
+            "razon_social": "PROVEEDOR " + pd.Series(self.rng.integers(1, 300, n)).astype(str),
+            "clave_articulo": pd.Series(self.rng.integers(10_000, 99_999, n)).astype(str),
+            "precio_unitario": self.rng.integers(5, 25_000, n),
+            "cantidad_solicitada": self.rng.integers(1, 500, n),
+            "fecha_autorizacion": autorizacion.strftime("%d/%m/%Y"),
+            "fecha_limite_entrega": (autorizacion + pd.to_timedelta(20, unit="D")).strftime("%d/%m/%Y"),
+            "orden_remision": "REM-" + ids,
+        })
+
+    def invoices(self, orders):
+        n = len(orders)
+        covered = orders[self.rng.random(n) < self.invoice_coverage]
+        m = len(covered)
+        importe = covered["precio_unitario"].astype(float) * covered["cantidad_solicitada"].astype(float)
+        folios = pd.Series(np.arange(m) + 100_000).astype(str)
+        # Algunas facturas no cuadran con el importe de la orden
+        total = np.where(self.rng.random(m) < 0.9, importe, importe * 1.16)
+        estado = np.where(self.rng.random(m) < self.cancelled_rate, "Cancelado", "Vigente")
+        facturas = pd.DataFrame({
+            "Referencia": self._with_whitespace(covered["numero_orden_suministro"].reset_index(drop=True)),
+            "Factura": "A-" + folios,
+            "UUID": [f"{u:032x}" for u in self.rng.integers(0, 2**62, m, dtype=np.int64)],
+            "Folio": "A-" + folios,
+            "UUID Descripción": estado,
+            "Total": total,
+            "Fecha": self._dates(m, start="2023-02-01"),
+        })
+        pagadas = facturas["Factura"].sample(n=m // 2, random_state=1).values
+        pagos = pd.DataFrame({
+            "Factura": pagadas,
+            "Importe pagado": self.rng.integers(100, 100_000, len(pagadas)),
+        })
+        return facturas, pagos
+
+    def sagi(self, invoices):
+        n = len(invoices)
+        covered = invoices[self.rng.random(n) < self.sagi_coverage].reset_index(drop=True)
+        m = len(covered)
+        orden = covered["Referencia"].str.strip().where(self.rng.random(m) >= self.sagi_missing_order)
+        estados = self.rng.choice(["Pagado", "En revisión", "Cancelado", "Programado"], m, p=[0.6, 0.2, 0.05, 0.15])
+        total = covered["Total"].map(lambda v: f"${v:,.2f}")
+        return pd.DataFrame({
+            "Orden de suministro": orden,
+            "Folio fiscal": covered["UUID"],
+            "Estado de la factura": estados,
+            "Total": total,
+            "Fecha de recepción": self._dates(m, start="2023-03-01").strftime("%d/%m/%Y"),
+        })
+
+    def penalties(self, orders):
+        n = len(orders)
+        penalised = orders[self.rng.random(n) < self.penalty_rate]
+        m = len(penalised)
+        return pd.DataFrame({
+            "ORDEN DE SUMINISTRO": penalised["numero_orden_suministro"].values,
+            "PENA": np.round(self.rng.random(m) * 5_000, 2),
+            "OFICIO": "OF-" + pd.Series(self.rng.integers(1, 9_999, m)).astype(str),
+        })
+
+    def generate(self):
+        """Devuelve un dict con orders, invoices, payments, sagi y penalties."""
+        orders = self.orders()
+        invoices, payments = self.invoices(orders)
+        return {
+            "orders": orders,
+            "invoices": invoices,
+            "payments": payments,
+            "sagi": self.sagi(invoices),
+            "penalties": self.penalties(orders),
+        }
+
+    def write_working_folder(self, working_folder, timestamp="2025-01-01-08", data=None):
+        """
+        Escribe los insumos con la estructura de Implementación (Camunda, SAGI,
+        Facturas, Penas) para correr DataIntegration de punta a punta. Devuelve
+        la sección PENAS para config.yaml.
+        """
+        data = data or self.generate()
+        for name, df in data.items():
+            if len(df) > EXCEL_MAX_ROWS:
+                raise ValueError(f"{name} tiene {len(df)} filas, más de las que admite una hoja de Excel")
+        folders = {name: os.path.join(working_folder, name) for name in ["Camunda", "SAGI", "Facturas", "Penas"]}
+        for folder in folders.values():
+            os.makedirs(folder, exist_ok=True)
+
+        data["orders"].to_excel(os.path.join(folders["Camunda"], f"{timestamp}h CAMUNDA.xlsx"), index=False)
+        data["sagi"].to_excel(os.path.join(folders["SAGI"], f"{timestamp}h SAGI.xlsx"), index=False)
+        with pd.ExcelWriter(os.path.join(folders["Facturas"], f"{timestamp}h_PAQS_INSABI.xlsx")) as writer:
+            data["invoices"].to_excel(writer, sheet_name="df_facturas", index=False)
+            data["payments"].to_excel(writer, sheet_name="df_pagos", index=False)
+        penalties_file = os.path.join(folders["Penas"], "penas_convencionales.xlsx")
+        with pd.ExcelWriter(penalties_file) as writer:
+            # Título y fila vacía antes del encabezado, como en los libros reales
+            pd.DataFrame([["PENAS CONVENCIONALES"], [None]]).to_excel(writer, sheet_name="PENAS", index=False, header=False)
+            data["penalties"].to_excel(writer, sheet_name="PENAS", index=False, startrow=2)
+        return {
+            "penas_sinteticas": {
+                "file_path": penalties_file,
+                "sheet": "PENAS",
+                "rows": list(data["penalties"].columns),
+            }
+        }
+
+    def write_cfdi_folder(self, folder, n_files, max_conceptos=5, subfolders=20):
+        """
+        Escribe n_files CFDI sintéticos (mitad 3.3, mitad 4.0) repartidos en
+        subcarpetas, como las descargas de los proveedores. Devuelve las rutas.
+        """
+        paths = []
+        conceptos = self.rng.integers(1, max_conceptos + 1, n_files)
+        for i in range(n_files):
+            version = "4" if i % 2 else "3"
+            sub = os.path.join(folder, f"proveedor_{i % subfolders:03d}")
+            os.makedirs(sub, exist_ok=True)
+            items = "".join(
+                f'<cfdi:Concepto ClaveProdServ="51100000" Cantidad="{c + 1}" ClaveUnidad="H87" '
+                f'Descripcion="MEDICAMENTO {i}-{c}" ValorUnitario="{(c + 1) * 10.5:.2f}" Importe="{(c + 1) ** 2 * 10.5:.2f}"/>'
+                for c in range(conceptos[i])
+            )
+            xml = (
+                '<?xml version="1.0" encoding="UTF-8"?>\n'
+                f'<cfdi:Comprobante xmlns:cfdi="http://www.sat.gob.mx/cfd/{version}" '
+                'xmlns:tfd="http://www.sat.gob.mx/TimbreFiscalDigital" '
+                'xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance" '
+                f'Version="{version}.{3 if version == "3" else 0}" Serie="A" Folio="{100_000 + i}" '
+                'Fecha="2024-05-01T10:00:00" SubTotal="100.00" Total="116.00" Moneda="MXN">'
+                '<cfdi:Emisor Rfc="PRO123456AB1" Nombre="PROVEEDOR" RegimenFiscal="601"/>'
+                '<cfdi:Receptor Rfc="IMS421231I45" Nombre="IMSS BIENESTAR" UsoCFDI="G03"/>'
+                f'<cfdi:Conceptos>{items}</cfdi:Conceptos>'
+                '<cfdi:Complemento><tfd:TimbreFiscalDigital Version="1.1" '
+                f'UUID="{i:08x}-0000-4000-8000-{i:012x}" FechaTimbrado="2024-05-01T10:05:00"/>'
+                '</cfdi:Complemento></cfdi:Comprobante>'
+            )
+            path = os.path.join(sub, f"A{100_000 + i}.xml")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(xml)
+            paths.append(path)
+        return paths
@@ -12,6 +12,8 @@ from modules.downloaded_files_manager import DownloadedFilesManager
 from modules.data_integration import DataIntegration
 from modules.sql_connexion_updating import SQL_CONNEXION_UPDATING
 from modules.helpers import HELPERS
+from modules.excel_cache import ExcelCache
+from modules.excel_io import ExcelReader
 from modules.db_payments_feed import DB_PAYMENTS_FEED
 
 class ETL_APP:
@@ -36,8 +38,14 @@ class ETL_APP:
             print("⚠️ Configura el archivo YAML antes de continuar")
             return False
         
+        # Caché de Excel parseados compartida por todas las etapas (excel_cache: false para desactivarla)
+        excel_cache = None
+        if self.data_access.get('excel_cache', True):
+            max_mb = self.data_access.get('excel_cache_max_mb', 1024)
+            excel_cache = ExcelCache(os.path.join(self.working_folder, ".cache", "excel"), max_bytes=int(max_mb) * 1024 * 1024)
         # Inicializar web driver manager (sin crear el driver aún)
-        self.helpers = HELPERS()
+        self.helpers = HELPERS(excel_cache, load_workers=self.data_access.get('load_workers', 'auto'),
+                               excel_reader=ExcelReader.from_config(self.data_access))
         downloads_path = os.path.join(self.working_folder)
         self.web_driver_manager = WebAutomationDriver(downloads_path)
         # Inicializar SAI manager
@@ -46,7 +54,7 @@ class ETL_APP:
         self.facturas_manager = FACTURAS(self.working_folder, self.data_access,self.helpers)
         self.downloaded_files_manager = DownloadedFilesManager(self.working_folder, self.data_access)
         self.data_integration = DataIntegration(self.working_folder, self.data_access, self.integration_path, self.helpers)
-        self.sql_integration = SQL_CONNEXION_UPDATING(self.integration_path, self.data_access)
+        self.sql_integration = SQL_CONNEXION_UPDATING(self.integration_path, self.data_access, self.helpers)
         self.data_warehouse = DataWarehouse(self.data_access, self.working_folder)
         
         print("✅ Inicialización completada")
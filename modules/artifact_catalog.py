@@ -0,0 +1,121 @@
+import os
+import re
+import sqlite3
+import datetime
+from modules.helpers import file_sha256
+
+
+class ArtifactCatalog:
+    """
+    Catálogo SQLite de los archivos producidos por el pipeline
+    (consolidados de Camunda/SAGI, bases de facturas).
+
+    Cada artefacto guarda categoría, timestamp (prefijo YYYY-MM-DD-HH del
+    nombre), ruta, tamaño, mtime y sha256. Las etapas que escriben archivos
+    los registran; las carpetas solo se vuelven a listar cuando su mtime
+    cambia (p. ej. si alguien copia un archivo a mano).
+    """
+
+    TS_PATTERN = re.compile(r"^(\d{4}-\d{2}-\d{2}-\d{2})")
+
+    def __init__(self, working_folder):
+        os.makedirs(working_folder, exist_ok=True)
+        self.db_path = os.path.join(working_folder, "artifacts.db")
+        with self._connect() as conn:
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS artifacts (
+                    path TEXT PRIMARY KEY,
+                    category TEXT NOT NULL,
+                    ts TEXT NOT NULL,
+                    size INTEGER,
+                    mtime_ns INTEGER,
+                    sha256 TEXT,
+                    registered_at TEXT
+                );
+                CREATE INDEX IF NOT EXISTS idx_artifacts_category_ts ON artifacts (category, ts);
+                CREATE TABLE IF NOT EXISTS folders (
+                    folder TEXT PRIMARY KEY,
+                    category TEXT NOT NULL,
+                    mtime_ns INTEGER
+                );
+            """)
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def _timestamp(self, file_path):
+        m = self.TS_PATTERN.match(os.path.basename(file_path))
+        if not m:
+            return None
+        return datetime.datetime.strptime(m.group(1), "%Y-%m-%d-%H")
+
+    def _upsert(self, conn, category, file_path):
+        """Inserta o actualiza un artefacto; solo recalcula el hash si cambió."""
+        ts = self._timestamp(file_path)
+        if ts is None or not os.path.isfile(file_path):
+            return False
+        file_path = os.path.abspath(file_path)
+        stat = os.stat(file_path)
+        row = conn.execute(
+            "SELECT size, mtime_ns FROM artifacts WHERE path = ?", (file_path,)
+        ).fetchone()
+        if row and row[0] == stat.st_size and row[1] == stat.st_mtime_ns:
+            return True
+        conn.execute(
+            "INSERT OR REPLACE INTO artifacts (path, category, ts, size, mtime_ns, sha256, registered_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (file_path, category, ts.isoformat(), stat.st_size, stat.st_mtime_ns,
+             file_sha256(file_path), datetime.datetime.now().isoformat(timespec='seconds')),
+        )
+        return True
+
+    def register(self, category, file_path):
+        """Registra un archivo recién escrito. Ignora nombres sin prefijo de fecha-hora."""
+        with self._connect() as conn:
+            registered = self._upsert(conn, category, file_path)
+        if not registered:
+            print(f"⚠️ {os.path.basename(file_path)} no tiene prefijo YYYY-MM-DD-HH, no se registra en el catálogo.")
+        return registered
+
+    def sync_folder(self, category, folder, extension=".xlsx"):
+        """
+        Reconcilia el catálogo con una carpeta. Si el mtime de la carpeta no
+        cambió desde la última vez, no se lista.
+        """
+        if not os.path.isdir(folder):
+            return
+        folder = os.path.abspath(folder)
+        folder_mtime = os.stat(folder).st_mtime_ns
+        with self._connect() as conn:
+            row = conn.execute("SELECT mtime_ns FROM folders WHERE folder = ?", (folder,)).fetchone()
+            if row and row[0] == folder_mtime:
+                return
+
+            present = set()
+            for f in os.listdir(folder):
+                if f.endswith(extension) and self.TS_PATTERN.match(f):
+                    path = os.path.join(folder, f)
+                    if self._upsert(conn, category, path):
+                        present.add(path)
+
+            # Quitar artefactos que ya no existen en la carpeta
+            known = conn.execute(
+                "SELECT path FROM artifacts WHERE category = ?", (category,)
+            ).fetchall()
+            stale = [(p,) for (p,) in known if os.path.dirname(p) == folder and p not in present]
+            conn.executemany("DELETE FROM artifacts WHERE path = ?", stale)
+            conn.execute(
+                "INSERT OR REPLACE INTO folders (folder, category, mtime_ns) VALUES (?, ?, ?)",
+                (folder, category, folder_mtime),
+            )
+            print(f"🗂️ Catálogo sincronizado para {category}: {len(present)} archivos, {len(stale)} retirados")
+
+    def files(self, categories):
+        """Lista (timestamp, categoría, ruta) de las categorías dadas ordenada por timestamp."""
+        placeholders = ",".join("?" for _ in categories)
+        with self._connect() as conn:
+            rows = conn.execute(
+                f"SELECT ts, category, path FROM artifacts WHERE category IN ({placeholders}) ORDER BY ts, path",
+                list(categories),
+            ).fetchall()
+        return [(datetime.datetime.fromisoformat(ts), cat, path) for ts, cat, path in rows]
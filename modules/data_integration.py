@@ -1,19 +1,72 @@
 import pandas as pd
+import numpy as np
 import datetime 
 import os
 import glob
-import re
 import json
+import hashlib
+import concurrent.futures
+import tempfile
+import time
+from modules.helpers import HELPERS, atomic_write_json, worker_count
+from modules.excel_io import ExcelReader, ExcelOutput
+from modules.artifact_catalog import ArtifactCatalog
 
 
+# Contexto de cada proceso del pool de integración (se llena en el initializer)
+_WORKER_CONTEXT = {}
+
+
+def _init_integration_worker(working_folder, data_access, integration_path, helpers, penalties_df):
+    _WORKER_CONTEXT['integration'] = DataIntegration(working_folder, data_access, integration_path, helpers)
+    _WORKER_CONTEXT['penalties_df'] = penalties_df
+
+
+def _integrate_group_worker(group):
+    integration = _WORKER_CONTEXT['integration']
+    integration.join_metrics = []
+    integration.group_metrics = []
+    # El proceso principal registra los grupos integrados en el manifiesto y las métricas
+    output_file_path = integration.integrar_grupo(group, _WORKER_CONTEXT['penalties_df'])
+    return output_file_path, integration.join_metrics, integration.group_metrics
+
 
 class DataIntegration:
+    ORDERS_INVOICE_JOIN = {
+        'left': ['numero_orden_suministro'],
+        'right': ['Referencia'],
+        'return': ['UUID', 'Folio']
+    }
+    ORDERS_SAGI_JOIN = {'left': ['numero_orden_suministro'], 'right': ['Orden de suministro'], 'return': ['Estado de la factura']}
+    ORDERS_PENALTIES_JOIN = {
+        'left': ['numero_orden_suministro'],
+        'right': ['ORDEN DE SUMINISTRO'],
+        'return': ['PENA', 'OFICIO']
+    }
+    # Columnas auxiliares con llaves normalizadas / codificadas (no se guardan en el Excel)
+    KEY_PREFIX = "__key_"
+    CODE_PREFIX = "__code_"
+    # Subir cuando cambie la lógica de integración para reconstruir los grupos ya integrados
+    INTEGRATION_VERSION = 1
+
     def __init__(self, working_folder, data_access, integration_path, helpers=None):
         self.working_folder = working_folder
         self.data_access = data_access  
         self.integration_path = integration_path 
         self.order_df = None
         self.helpers = helpers
+        self.excel_reader = helpers.excel_reader if helpers is not None else ExcelReader.from_config(data_access)
+        self.excel_output = ExcelOutput.from_config(data_access)
+        # Métricas estructuradas de la corrida: un registro por join y uno por grupo
+        self.join_metrics = []
+        self.group_metrics = []
+        self.metrics_context = {}
+        # Normalización de llaves de join (sin espacios) y, opcionalmente, códigos enteros.
+        # Desactivada por defecto: quitar espacios sube el número de coincidencias.
+        config = data_access or {}
+        self.key_normalization = bool(config.get('integration_key_normalization', False))
+        self.key_codes = bool(config.get('integration_key_codes', False))
+        self._key_vocabulary = pd.Index([], dtype=object)
         self.accounts=os.path.join(self.working_folder, "SAGI")
         self.logistica=os.path.join(self.working_folder, "Logística")
         self.facturas_path=os.path.join(self.working_folder, "Facturas")
@@ -24,31 +77,18 @@ class DataIntegration:
             "Facturas": self.facturas_path,
             "Ordenes": self.ordenes_path
             }
-        self.record_file=os.path.join(self.integration_path,"processed_file.db")   
+        self.manifest_file=os.path.join(self.integration_path,"integration_manifest.json")
+        self.catalog = ArtifactCatalog(self.working_folder)
 
     def generate_file_groups(self):
-        print(self.folders)
-        from datetime import datetime, timedelta
+        from datetime import timedelta
         print(f"🔍 Buscando archivos más recientes...")
-        # Regex para extraer yyyy-mm-dd-hh
-        ts_pattern = re.compile(r"^(\d{4}-\d{2}-\d{2}-\d{2})")
-        
-        # 1. Escanear todos los archivos
-        all_files = []
+        # 1. Consultar el catálogo de artefactos (solo relista carpetas cuyo mtime cambió)
         for cat, folder in self.folders.items():
-            if not os.path.exists(folder):
-                continue
-            for f in os.listdir(folder):
-                if f.endswith(".xlsx"):
-                    m = ts_pattern.match(f)
-                    if m:
-                        ts = datetime.strptime(m.group(1), "%Y-%m-%d-%H")
-                        all_files.append((ts, cat, os.path.join(folder, f)))
-
-        # 2. Ordenar por timestamp
-        all_files.sort(key=lambda x: x[0])
+            self.catalog.sync_folder(cat, folder)
+        all_files = self.catalog.files(self.folders.keys())
 
-        # 3. Agrupar con ventana de 2 horas
+        # 2. Agrupar con ventana de 2 horas (el catálogo ya los entrega ordenados por timestamp)
         groups = []
         current = []
         for ts, cat, path in all_files:
@@ -64,7 +104,7 @@ class DataIntegration:
         if current:
             groups.append(current)
 
-        # 4. Formar all_groups y complete_groups
+        # 3. Formar all_groups y complete_groups
         all_groups = []
         complete_groups = []
         for g in groups:
@@ -95,12 +135,9 @@ class DataIntegration:
                     ts_prefix = fname[:13]  # YYYY-MM-DD-HH
                     hours.append(ts_prefix)
             if hours and all(h == hours[0] for h in hours):
-                exact_match = True
                 exact_match_count += 1
             else:
-                exact_match = False
                 different_count += 1
-            print(f"Grupo {g['group_id']} → same_datehour == {exact_match}")
 
         print(f"📊 Grupos con misma fecha-hora exacta: {exact_match_count}")
         print(f"📊 Grupos con diferencias de hora: {different_count}")
@@ -113,116 +150,465 @@ class DataIntegration:
              
     def integrar_datos(self):
         print("\n🔗 Iniciando proceso de TRANSFORMACIÓN de datos...")
+        run_started = datetime.datetime.now()
+        self.join_metrics = []
+        self.group_metrics = []
         group_preffix_file = self.generate_file_groups()
-        # Load the record file to check for existing processed files
-        if os.path.exists(self.record_file):
-            with open(self.record_file, "r") as f:
-                record = json.load(f)
-        else:
-            record = {}
+        # El manifiesto guarda la huella de los insumos de cada grupo ya integrado
+        manifest = self.load_manifest()
+        penalties_config = self.data_access.get('PENAS') or {}
+        penalties_signature = self.helpers.files_signature(penalties_config)
+        settings_hash = self.settings_fingerprint()
+
+        pending_groups = []
+        fingerprints = {}
         for group in group_preffix_file:
-            # Compute output file path
-            prefix = group['group_id'].split("_")[0]   # "2025-09-19-08"
-            output_file_name = f'{prefix}_Integracion IMSSB.xlsx' 
-            output_file_path = os.path.join(self.integration_path, output_file_name)
-            file_key = os.path.abspath(output_file_path)
-
-            # Check if file exists and matches the record
-            skip_processing = False
-            if file_key in record and os.path.exists(output_file_path):
-                last_mod_time = os.path.getmtime(output_file_path)
-                if abs(record[file_key] - last_mod_time) < 1:  # tolerance of 1 second
-                    print(f"⏩ Grupo '{group['group_id']}' ya procesado y sin cambios, omitiendo procesamiento.")
-                    skip_processing = True
-
-            if skip_processing:
+            output_file_path = self.output_file_path(group)
+            fingerprint = self.group_fingerprint(group, penalties_signature, settings_hash)
+            fingerprints[group['group_id']] = fingerprint
+
+            # Omitimos el grupo, sin abrir ningún Excel, si sus insumos no cambiaron
+            entry = manifest.get(group['group_id'])
+            if entry and entry.get('inputs') == fingerprint and os.path.exists(output_file_path):
+                print(f"⏩ Grupo '{group['group_id']}' ya procesado y sin cambios, omitiendo procesamiento.")
                 continue
-            # Procesamos grupos de archivos que no han sido procesados previamente.             
-            # Cargamos dataframes 
-            #df_logistica = pd.read_excel(group['Logistica'])    if group['Logistica']    else pd.DataFrame()
-            raw_accounts_df     = pd.read_excel(group['SAGI'])     if group['SAGI']     else pd.DataFrame()
-            if group.get("Facturas"):
-                with pd.ExcelFile(group["Facturas"]) as xls:
-                    sheets = xls.sheet_names
-                    print(f"📑 Available sheets in {group['Facturas']}: {sheets}")
-                    # Use "df_facturas" if exists, else the first sheet (index 0)
-                    invoice_sheet = "df_facturas" if "df_facturas" in sheets else 0
-                    raw_invoice_df = pd.read_excel(xls, sheet_name=invoice_sheet)
-                    raw_pagos = pd.read_excel(xls, sheet_name="df_pagos") if "df_pagos" in sheets else pd.DataFrame()
-            else:
-                raw_invoice_df = pd.DataFrame()
-                raw_pagos = pd.DataFrame()
-
-            self.order_df  = pd.read_excel(group['Ordenes'])  if group['Ordenes']  else pd.DataFrame()
-            # Generamos fecha de grupo de archivos 
-            prefix = group['group_id'].split("_")[0]   # "2025-09-19-08"
-            dt = datetime.datetime.strptime(prefix, "%Y-%m-%d-%H")
-            group_date = dt.replace(minute=0, second=0, microsecond=0)
-
-            #-- sECCIÓN PARA 
-            self.order_df['Importe'] = self.order_df['precio_unitario'].astype(float) * self.order_df['cantidad_solicitada'].astype(float)
-            # Versiones limpias de facturas, SAGI, órdenes se mantiene igual. 
-            invoice_df = self.clean_invoice_df(raw_invoice_df)
-            accounts_df = self.clean_accounts_df(raw_accounts_df, invoice_df)    
-            # Carga de logística
-            yaml_penalties_key = 'PENAS'
-            # Carga de penas convencionales
-            penalties_df = self.helpers.load_and_concat(self.data_access.get(yaml_penalties_key))
-            
-            # Unión de Órdenes con facturas        
-            print(self.order_df['numero_orden_suministro'].nunique())
-            print(self.order_df.shape)
-            orders_invoice_join = {
-                'left': ['numero_orden_suministro'],
-                'right': ['Referencia'],
-                'return': ['UUID', 'Folio']
-            }        
-            self.order_df = self.populate_df(self.order_df, invoice_df, orders_invoice_join)
-            orders_sagi_join = {'left': ['numero_orden_suministro'], 'right': ['Orden de suministro'], 'return': ['Estado de la factura']}
-            self.order_df = self.populate_df(self.order_df, accounts_df, orders_sagi_join)
-            # Unión con penas convencionales
-            orders_penalties_join = {
-                        'left': ['numero_orden_suministro'],
-                        'right': ['ORDEN DE SUMINISTRO'],
-                        'return': ['PENA', 'OFICIO']
-                    }              
-            self.order_df = self.populate_df(self.order_df, penalties_df, orders_penalties_join)
-            
-            self.order_df['PENA'] = self.order_df['PENA'] = pd.to_numeric(self.order_df['PENA'], errors='coerce')
-            self.order_df['file_date']= group_date
-            ## Agregamos prefijo a columnas de penas convencionales
-            
-            # Unión con pagos
-            
-            
-
-            # Unión con datos logísticos.
-
-            # Guardar archivo de integración
-            output_file_name = f'{prefix}_Integracion INSABI.xlsx' 
-            output_file_path = os.path.join(self.integration_path, output_file_name)
-            self.save_if_modified(output_file_path, {
-                "CAMUNDA": self.order_df,
-                "SAGI": accounts_df,
-                "FACTURAS": invoice_df,
-                "PAGOS": raw_pagos,
-                #"LOGÍSTICA": df_logistica
-            }, self.record_file)
-            ## Renombrar columnas para 
-            prefix_merged = "sagi_"
-            for c in orders_sagi_join["return"]:
-                if c in self.order_df.columns:
-                    self.order_df.rename(columns={c: f"{prefix_merged}{c}"}, inplace=True)            
-            
-
-    def save_if_modified(self, output_file_path, df_dict, record_file):
+            pending_groups.append(group)
+
+        if not pending_groups:
+            print("✔️ No hay grupos pendientes de integrar.")
+            return
+
+        # Carga de penas convencionales (caché por proceso, se comparte con todos los grupos)
+        yaml_penalties_key = 'PENAS'
+        penalties_df = self.helpers.load_reference(self.data_access.get(yaml_penalties_key))
+
+        workers = self._integration_workers(len(pending_groups))
+        if workers > 1:
+            integrated = self.integrar_grupos_en_paralelo(pending_groups, penalties_df, workers)
+            self.update_manifest(manifest, integrated, fingerprints)
+        else:
+            integrated = []
+            for group in pending_groups:
+                output_file_path = self.integrar_grupo(group, penalties_df)
+                integrated.append((group, output_file_path))
+                self.update_manifest(manifest, [(group, output_file_path)], fingerprints)
+        print(f"📊 Grupos integrados: {len(integrated)} de {len(pending_groups)} pendientes")
+        self.write_metrics(run_started, workers)
+        self.helpers.print_cache_stats()
+
+    def read_excel(self, path, **kwargs):
+        # Lecturas a través de la caché compartida de HELPERS cuando está disponible
+        if self.helpers is not None:
+            return self.helpers.read_excel(path, **kwargs)
+        return self.excel_reader.read_excel(path, **kwargs)
+
+    def sheet_names(self, path):
+        if self.helpers is not None:
+            return self.helpers.sheet_names(path)
+        return self.excel_reader.sheet_names(path)
+
+    def output_file_path(self, group):
+        prefix = group['group_id'].split("_")[0]   # "2025-09-19-08"
+        return os.path.join(self.integration_path, f'{prefix}_Integracion INSABI.xlsx')
+
+    def settings_fingerprint(self):
+        """
+        Hash de la configuración que cambia el resultado de la integración
+        (normalización/códigos de llaves, particiones, hojas y filas de PENAS)
+        y de INTEGRATION_VERSION.
+        """
+        config = self.data_access or {}
+        penalties = {
+            name: {'file_path': cfg.get('file_path'), 'sheet': cfg.get('sheet'), 'rows': cfg.get('rows')}
+            for name, cfg in (config.get('PENAS') or {}).items()
+        }
+        settings = {
+            'version': self.INTEGRATION_VERSION,
+            'integration_key_normalization': self.key_normalization,
+            'integration_key_codes': self.key_codes,
+            'integration_partitions': self._integration_partitions(),
+            'PENAS': penalties,
+        }
+        payload = json.dumps(settings, sort_keys=True, default=str).encode("utf-8")
+        return hashlib.sha1(payload).hexdigest()
+
+    def group_fingerprint(self, group, penalties_signature, settings_hash=None):
+        """
+        Huella de los insumos del grupo: ruta, tamaño y mtime de SAGI, Facturas y
+        Órdenes, la firma de los archivos de PENAS y el hash de la configuración
+        (settings_fingerprint). Solo usa os.stat.
+        """
+        fingerprint = {}
+        for cat in self.folders.keys():
+            path = group.get(cat)
+            try:
+                stat = os.stat(path)
+                fingerprint[cat] = [os.path.abspath(path), stat.st_size, stat.st_mtime_ns]
+            except (OSError, TypeError):
+                fingerprint[cat] = [path, None, None]
+        fingerprint['PENAS'] = [list(entry) for entry in penalties_signature]
+        fingerprint['settings'] = settings_hash or self.settings_fingerprint()
+        return fingerprint
+
+    def load_manifest(self):
+        if os.path.exists(self.manifest_file):
+            try:
+                with open(self.manifest_file, "r", encoding="utf-8") as f:
+                    return json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"⚠️ No se pudo leer el manifiesto {os.path.basename(self.manifest_file)}: {e}")
+        return {}
+
+    def update_manifest(self, manifest, integrated, fingerprints):
+        """Registra la huella de insumos de los grupos integrados y guarda el manifiesto."""
+        for group, output_file_path in integrated:
+            if not output_file_path:
+                continue
+            manifest[group['group_id']] = {
+                'inputs': fingerprints[group['group_id']],
+                'output': os.path.abspath(output_file_path),
+                'integrated_at': datetime.datetime.now().isoformat(timespec='seconds'),
+            }
+        atomic_write_json(self.manifest_file, manifest, indent=2)
+
+    def _integration_workers(self, n_groups):
+        """
+        Número de procesos para integrar grupos según `integration_workers` en config.yaml
+        (entero o 'auto'). Por defecto 1, es decir, procesamiento secuencial.
+        """
+        configured = self.data_access.get('integration_workers', 1) if self.data_access else 1
+        return worker_count(configured, n_groups, 'integration_workers')
+
+    def integrar_grupos_en_paralelo(self, groups, penalties_df, workers):
+        """
+        Integra grupos en un pool de procesos. Cada proceso recibe una sola vez la
+        configuración y las penas convencionales (datos de solo lectura) y escribe
+        su propio libro de salida; el manifiesto lo actualiza únicamente este
+        proceso para evitar escrituras concurrentes.
+        Devuelve la lista de (grupo, archivo guardado) integrados con éxito.
+        """
+        print(f"⚙️ Integrando {len(groups)} grupos con {workers} procesos...")
+        integrated = []
+        with concurrent.futures.ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_integration_worker,
+            initargs=(self.working_folder, self.data_access, self.integration_path, self.helpers, penalties_df),
+        ) as executor:
+            futures = {executor.submit(_integrate_group_worker, group): group for group in groups}
+            for future in concurrent.futures.as_completed(futures):
+                group = futures[future]
+                try:
+                    output_file_path, join_metrics, group_metrics = future.result()
+                    self.join_metrics.extend(join_metrics)
+                    self.group_metrics.extend(group_metrics)
+                except Exception as e:
+                    print(f"❌ Error integrando grupo '{group['group_id']}': {e}")
+                    continue
+                if output_file_path:
+                    integrated.append((group, output_file_path))
+                    print(f"✅ Grupo '{group['group_id']}' integrado → {os.path.basename(output_file_path)}")
+
+        return integrated
+
+    def integrar_grupo(self, group, penalties_df):
+        """
+        Integra un grupo de archivos (SAGI, Facturas, Órdenes) y guarda su libro
+        de integración. Devuelve la ruta del archivo guardado.
+        """
+        timings = {}
+        t_start = time.perf_counter()
+        self.metrics_context = {'group_id': group['group_id']}
+        # Cargamos dataframes 
+        #df_logistica = pd.read_excel(group['Logistica'])    if group['Logistica']    else pd.DataFrame()
+        raw_accounts_df     = self.read_excel(group['SAGI'])     if group['SAGI']     else pd.DataFrame()
+        if group.get("Facturas"):
+            sheets = self.sheet_names(group["Facturas"])
+            print(f"📑 Available sheets in {group['Facturas']}: {sheets}")
+            # Use "df_facturas" if exists, else the first sheet (index 0)
+            invoice_sheet = "df_facturas" if "df_facturas" in sheets else 0
+            raw_invoice_df = self.read_excel(group["Facturas"], sheet_name=invoice_sheet)
+            raw_pagos = self.read_excel(group["Facturas"], sheet_name="df_pagos") if "df_pagos" in sheets else pd.DataFrame()
+        else:
+            raw_invoice_df = pd.DataFrame()
+            raw_pagos = pd.DataFrame()
+
+        self.order_df  = self.read_excel(group['Ordenes'])  if group['Ordenes']  else pd.DataFrame()
+        # Generamos fecha de grupo de archivos 
+        prefix = group['group_id'].split("_")[0]   # "2025-09-19-08"
+        dt = datetime.datetime.strptime(prefix, "%Y-%m-%d-%H")
+        group_date = dt.replace(minute=0, second=0, microsecond=0)
+
+        timings['read_s'] = time.perf_counter() - t_start
+        input_rows = {
+            'orders': len(self.order_df), 'invoices': len(raw_invoice_df), 'accounts': len(raw_accounts_df),
+            'penalties': len(penalties_df), 'payments': len(raw_pagos),
+        }
+
+        #-- sECCIÓN PARA 
+        self.order_df['Importe'] = self.order_df['precio_unitario'].astype(float) * self.order_df['cantidad_solicitada'].astype(float)
+        # Los insumos pasan a integrar_insumos, que libera cada uno en cuanto deja de usarlo
+        inputs = {'invoices': raw_invoice_df, 'accounts': raw_accounts_df}
+        del raw_invoice_df, raw_accounts_df
+        n_partitions = self._integration_partitions()
+        self.order_df, invoice_df, accounts_df = self.integrar_insumos(inputs, penalties_df, n_partitions, timings)
+        
+        self.order_df['PENA'] = self.order_df['PENA'] = pd.to_numeric(self.order_df['PENA'], errors='coerce')
+        self.order_df['file_date']= group_date
+        ## Agregamos prefijo a columnas de penas convencionales
+        
+        # Unión con pagos
+        
+        
+
+        # Unión con datos logísticos.
+
+        # Guardar archivo de integración (el manifiesto ya decidió que hay cambios)
+        output_file_path = self.output_file_path(group)
+        t_stage = time.perf_counter()
+        self.save_if_modified(output_file_path, {
+            "CAMUNDA": self.order_df,
+            "SAGI": accounts_df,
+            "FACTURAS": invoice_df,
+            "PAGOS": raw_pagos,
+            #"LOGÍSTICA": df_logistica
+        })
+        timings['save_s'] = time.perf_counter() - t_stage
+        timings['total_s'] = time.perf_counter() - t_start
+        self.record_group_metrics(group, input_rows, timings, n_partitions, output_file_path)
+        ## Renombrar columnas para 
+        prefix_merged = "sagi_"
+        for c in self.ORDERS_SAGI_JOIN["return"]:
+            if c in self.order_df.columns:
+                self.order_df.rename(columns={c: f"{prefix_merged}{c}"}, inplace=True)            
+        return output_file_path
+
+    def integrar_insumos(self, inputs, penalties_df, n_partitions=0, timings=None):
+        """
+        Limpia facturas y SAGI y las une con self.order_df (con 'Importe' ya
+        calculado). `inputs` ({'invoices', 'accounts'}) se vacía: así el modo
+        particionado puede soltar cada insumo antes de repartirlo en disco.
+        Devuelve (order_df, invoice_df, accounts_df) y registra clean_s / join_s en timings.
+        """
+        timings = {} if timings is None else timings
+        print(self.order_df['numero_orden_suministro'].nunique())
+        print(self.order_df.shape)
+        t_stage = time.perf_counter()
+        if n_partitions > 1:
+            # Modo fuera de memoria: joins por partición de la llave de orden
+            result = self.integrar_particionado(inputs, penalties_df, n_partitions)
+            timings['join_s'] = time.perf_counter() - t_stage
+            return result
+        # Versiones limpias de facturas, SAGI, órdenes se mantiene igual. 
+        invoice_df = self.clean_invoice_df(inputs.pop('invoices'))
+        accounts_df = self.clean_accounts_df(inputs.pop('accounts'), invoice_df)    
+        # Carga de logística
+        timings['clean_s'] = time.perf_counter() - t_stage
+        t_stage = time.perf_counter()
+        order_df = self.join_orders(self.order_df, invoice_df, accounts_df, penalties_df)
+        timings['join_s'] = time.perf_counter() - t_stage
+        return order_df, invoice_df, accounts_df
+
+    def join_orders(self, order_df, invoice_df, accounts_df, penalties_df):
+        """Une las órdenes con facturas, SAGI y penas convencionales por número de orden."""
+        # Unión de Órdenes con facturas        
+        order_df = self.populate_df(order_df, invoice_df, self.ORDERS_INVOICE_JOIN)
+        order_df = self.populate_df(order_df, accounts_df, self.ORDERS_SAGI_JOIN)
+        # Unión con penas convencionales
+        order_df = self.populate_df(order_df, penalties_df, self.ORDERS_PENALTIES_JOIN)
+        return order_df
+
+    def _integration_partitions(self):
+        """Particiones del modo fuera de memoria (`integration_partitions` en config.yaml, 0 = desactivado)."""
+        configured = self.data_access.get('integration_partitions', 0) if self.data_access else 0
+        try:
+            return max(0, int(configured or 0))
+        except (TypeError, ValueError):
+            print(f"⚠️ Valor inválido para integration_partitions: {configured}, se integra en memoria.")
+            return 0
+
+    @staticmethod
+    def _partition_ids(key_series, n_partitions, chunk_rows=100_000):
+        # Llave normalizada: sin espacios y con nulos como cadena vacía. Se calcula
+        # por bloques para no duplicar en memoria la columna completa de llaves.
+        ids = np.empty(len(key_series), dtype=np.uint64)
+        for start in range(0, len(key_series), chunk_rows):
+            chunk = key_series.iloc[start:start + chunk_rows]
+            key = chunk.astype(str).str.replace(r"\s+", "", regex=True).where(chunk.notna(), "")
+            ids[start:start + len(chunk)] = pd.util.hash_pandas_object(key, index=False).to_numpy() % n_partitions
+        return ids
+
+    def _spill_partitions(self, df, key_col, n_partitions, spill_dir):
+        """
+        Escribe df en disco repartido por hash de key_col, una partición a la vez
+        (sin copiar df completo), con su posición original en la columna __row.
+        Guarda también el esquema vacío.
+        """
+        os.makedirs(spill_dir, exist_ok=True)
+        df.iloc[0:0].assign(__row=pd.Series(dtype="int64")).to_pickle(os.path.join(spill_dir, "schema.pkl"))
+        ids = self._partition_ids(df[key_col], n_partitions)
+        for pid in np.unique(ids):
+            rows = np.flatnonzero(ids == pid)
+            part = df.take(rows)
+            part['__row'] = rows
+            part.to_pickle(os.path.join(spill_dir, f"part_{pid}.pkl"))
+
+    @staticmethod
+    def _load_partition(spill_dir, pid):
+        part_file = os.path.join(spill_dir, f"part_{pid}.pkl")
+        if os.path.exists(part_file):
+            return pd.read_pickle(part_file)
+        return pd.read_pickle(os.path.join(spill_dir, "schema.pkl"))
+
+    @staticmethod
+    def _reassemble(spill_dir, n_partitions):
+        """Une las particiones de resultado y restaura el orden original de filas (__row)."""
+        parts = [DataIntegration._load_partition(spill_dir, pid) for pid in range(n_partitions)]
+        df = pd.concat(parts, ignore_index=True)
+        del parts
+        df = df.take(np.argsort(df['__row'].to_numpy(), kind='stable'))
+        del df['__row']
+        return df.reset_index(drop=True)
+
+    def integrar_particionado(self, inputs, penalties_df, n_partitions):
+        """
+        Modo fuera de memoria. Cada insumo se reparte en disco por hash del
+        número de orden normalizado y se suelta; las órdenes primero, y facturas
+        y SAGI después de limpiarse completas (SAGI se completa por UUID, que no
+        es la llave de orden). Los joins corren partición por partición y cada
+        resultado se escribe también a disco; al final cada DataFrame se
+        reconstruye una sola vez, en el mismo orden de filas que el modo en memoria. Las penas (datos de referencia
+        que ya viven en la caché de HELPERS) no se copian a disco: se toma la
+        porción de cada partición.
+        `inputs` ({'invoices', 'accounts'}) se vacía. Devuelve (order_df, invoice_df, accounts_df).
+        """
+        print(f"🧩 Integración particionada en {n_partitions} particiones...")
+        spill_root = os.path.join(self.working_folder, ".cache", "partitions")
+        os.makedirs(spill_root, exist_ok=True)
+        with tempfile.TemporaryDirectory(dir=spill_root) as spill_dir:
+            broadcast = {}
+
+            def spill(name, df, key_col):
+                if key_col in df.columns:
+                    self._spill_partitions(df, key_col, n_partitions, os.path.join(spill_dir, name))
+                else:
+                    # Sin llave no hay join posible: se comparte completo con cada partición
+                    broadcast[name] = df
+
+            # Las órdenes no se limpian: van a disco antes de limpiar facturas y SAGI
+            order_df, self.order_df = self.order_df, None
+            spill('orders', order_df, 'numero_orden_suministro')
+            del order_df
+            invoice_df = self.clean_invoice_df(inputs.pop('invoices'), validate_orders=False)
+            accounts_df = self.clean_accounts_df(inputs.pop('accounts'), invoice_df)
+            spill('invoices', invoice_df, 'Referencia')
+            del invoice_df
+            spill('accounts', accounts_df, 'Orden de suministro')
+            del accounts_df
+
+            penalties_key = 'ORDEN DE SUMINISTRO'
+            penalty_ids = (self._partition_ids(penalties_df[penalties_key], n_partitions)
+                           if penalties_key in penalties_df.columns else None)
+
+            def load(name, pid):
+                if name in broadcast:
+                    return broadcast[name]
+                return self._load_partition(os.path.join(spill_dir, name), pid)
+
+            outputs = {name: os.path.join(spill_dir, f"{name}_out") for name in ('orders', 'invoices', 'accounts')}
+            for folder in outputs.values():
+                os.makedirs(folder)
+            for pid in range(n_partitions):
+                self.metrics_context['partition'] = pid
+                order_p = load('orders', pid)
+                invoice_p = self.validate_invoices(load('invoices', pid), order_p)
+                accounts_p = load('accounts', pid)
+                penalties_p = penalties_df if penalty_ids is None else penalties_df.take(np.flatnonzero(penalty_ids == pid))
+                order_p = self.join_orders(order_p, invoice_p, accounts_p, penalties_p)
+                for name, part in (('orders', order_p), ('invoices', invoice_p), ('accounts', accounts_p)):
+                    if name not in broadcast:
+                        part.to_pickle(os.path.join(outputs[name], f"part_{pid}.pkl"))
+                del order_p, invoice_p, accounts_p, penalties_p
+            self.metrics_context.pop('partition', None)
+
+            results = []
+            for name in ('orders', 'invoices', 'accounts'):
+                results.append(broadcast[name] if name in broadcast else self._reassemble(outputs[name], n_partitions))
+        return tuple(results)
+
+    def record_join_metrics(self, query_dict, left_df, right_df, status, started, merged=None,
+                            left_unmatched=None, right_groups=None):
+        """Registro estructurado de un join de populate_df."""
+        record = dict(self.metrics_context)
+        record.update({
+            'left_keys': '+'.join(query_dict['left']),
+            'right_keys': '+'.join(query_dict['right']),
+            'return_cols': '+'.join(query_dict['return']),
+            'status': status,
+            'left_rows': len(left_df),
+            'right_rows': len(right_df),
+            'right_key_groups': right_groups,
+            'matched_rows': None,
+            'match_rate': None,
+            'fan_out': None,
+            'duration_s': round(time.perf_counter() - started, 4),
+            'memory_delta_mb': None,
+        })
+        if merged is not None:
+            matched = len(merged) - left_unmatched
+            record['matched_rows'] = int(matched)
+            record['match_rate'] = round(matched / len(merged), 4) if len(merged) else None
+            record['fan_out'] = round(len(merged) / len(left_df), 4) if len(left_df) else None
+            # Diferencia de tamaño del DataFrame resultante contra el izquierdo
+            delta = merged.memory_usage(index=True).sum() - left_df.memory_usage(index=True).sum()
+            record['memory_delta_mb'] = round(delta / (1024 * 1024), 3)
+        self.join_metrics.append(record)
+
+    def record_group_metrics(self, group, input_rows, timings, n_partitions, output_file_path):
+        summary = {
+            'group_id': group['group_id'],
+            'mode': 'partitioned' if n_partitions > 1 else 'memory',
+            'partitions': n_partitions if n_partitions > 1 else None,
+            'output': os.path.basename(output_file_path),
+            'output_rows': len(self.order_df),
+            'joins': sum(1 for j in self.join_metrics if j.get('group_id') == group['group_id']),
+        }
+        summary.update({f'rows_{k}': v for k, v in input_rows.items()})
+        summary.update({k: round(v, 3) for k, v in timings.items()})
+        self.group_metrics.append(summary)
+        print(f"⏱️ Grupo {group['group_id']}: {summary['total_s']} s "
+              f"(lectura {summary.get('read_s')} s, joins {summary.get('join_s')} s, guardado {summary.get('save_s')} s)")
+
+    def write_metrics(self, run_started, workers):
+        """Escribe las métricas de la corrida en Integración/metrics como JSON (todo) y CSV (joins)."""
+        if not self.group_metrics and not self.join_metrics:
+            return
+        metrics_folder = os.path.join(self.integration_path, "metrics")
+        os.makedirs(metrics_folder, exist_ok=True)
+        run_id = run_started.strftime("%Y-%m-%d-%H%M%S")
+        payload = {
+            'run_id': run_id,
+            'started': run_started.isoformat(timespec='seconds'),
+            'finished': datetime.datetime.now().isoformat(timespec='seconds'),
+            'workers': workers,
+            'groups': self.group_metrics,
+            'joins': self.join_metrics,
+        }
+        json_file = os.path.join(metrics_folder, f"{run_id}_metrics.json")
+        with open(json_file, "w", encoding="utf-8") as f:
+            json.dump(payload, f, ensure_ascii=False, indent=2, default=str)
+        if self.join_metrics:
+            pd.DataFrame(self.join_metrics).to_csv(os.path.join(metrics_folder, f"{run_id}_joins.csv"), index=False)
+        print(f"📈 Métricas de integración guardadas en {os.path.basename(json_file)}")
+
+    def save_if_modified(self, output_file_path, df_dict, record_file=None):
         """
         Guarda múltiples DataFrames en un Excel solo si el archivo destino
         no tiene la misma fecha de modificación registrada.
+        Si record_file es None no se consulta ni se actualiza el registro.
         """
 
         # 1. Cargar registro si existe
-        if os.path.exists(record_file):
+        if record_file and os.path.exists(record_file):
             with open(record_file, "r") as f:
                 record = json.load(f)
         else:
@@ -241,38 +627,54 @@ class DataIntegration:
                 print(f"⏩ Archivo '{os.path.basename(output_file_path)}' no ha cambiado desde {mod_dt}, no se sobrescribe.")
                 return
 
+        # Quitar columnas auxiliares de llaves antes de guardar
+        aux_prefixes = (self.KEY_PREFIX, self.CODE_PREFIX)
+        df_dict = {
+            name: df.drop(columns=[c for c in df.columns if str(c).startswith(aux_prefixes)])
+            for name, df in df_dict.items()
+        }
+
         # 3. Escribir el archivo
-        with pd.ExcelWriter(output_file_path, engine='openpyxl') as writer:
+        self.excel_output.write(output_file_path, df_dict, skip_empty=True)
+        for name, df in df_dict.items():
+            if not df.empty:
+                print(f"✅ Hoja '{name}' guardada con {len(df)} filas")
+
+        # Copia columnar por hoja para lecturas rápidas (el Excel se conserva para consulta)
+        if HELPERS.parquet_available():
             for name, df in df_dict.items():
                 if not df.empty:
-                    df.to_excel(writer, sheet_name=name, index=False)
-                    print(f"✅ Hoja '{name}' guardada con {len(df)} filas")
+                    HELPERS.to_parquet_safe(df, HELPERS.parquet_sheet_path(output_file_path, name))
+        else:
+            print("ℹ️ pyarrow no está instalado, se omite la copia Parquet.")
 
         print(f"\n🎉 ¡Integración completada exitosamente!")
         print(f"📁 Archivo guardado en: {os.path.basename(output_file_path)}")
 
         # 4. Actualizar registro
-        new_mod_time = os.path.getmtime(output_file_path)
-        record[file_key] = new_mod_time
-        with open(record_file, "w") as f:
-            json.dump(record, f)
+        if record_file:
+            record[file_key] = os.path.getmtime(output_file_path)
+            with open(record_file, "w") as f:
+                json.dump(record, f)
 
     def clean_accounts_df(self, accounts_df, invoice_df):
         accounts_df = accounts_df[accounts_df['Estado de la factura'] != 'Cancelado']
         account_df_nan = accounts_df[accounts_df['Orden de suministro'].isna()]
         accounts_invoice_join = {'left': ['Folio fiscal'], 'right': ['UUID'], 'return': ['Referencia']}
         account_df_nan = self.populate_df(account_df_nan, invoice_df, accounts_invoice_join)
-        # Solo los Folio fiscal donde Referencia no es nula
-        mask = account_df_nan['Referencia'].notna()
-        for folio, referencia in zip(account_df_nan.loc[mask, 'Folio fiscal'], account_df_nan.loc[mask, 'Referencia']):
-            accounts_df.loc[accounts_df['Folio fiscal'] == folio, 'Orden de suministro'] = referencia
+        # Solo los Folio fiscal donde Referencia no es nula (si un folio se repite, gana el último)
+        mask = account_df_nan['Referencia'].notna() & account_df_nan['Folio fiscal'].notna()
+        folio_to_ref = dict(zip(account_df_nan.loc[mask, 'Folio fiscal'], account_df_nan.loc[mask, 'Referencia']))
+        referencias = accounts_df['Folio fiscal'].map(folio_to_ref)
+        found = referencias.notna()
+        accounts_df.loc[found, 'Orden de suministro'] = referencias[found]
 
         #print(account_df_nan.info())
         accounts_df['Total'] = accounts_df['Total'].replace('[\$,]', '', regex=True).astype(float)
         return accounts_df
     
 
-    def clean_invoice_df(self, invoice_df):
+    def clean_invoice_df(self, invoice_df, validate_orders=True):
         print("🔍 Valores únicos en 'UUID Descripción':", invoice_df['UUID Descripción'].astype(str).unique()[:20])
 
         debug_ref = "IMB-23-02-2025-23026576-U013"
@@ -298,6 +700,9 @@ class DataIntegration:
 
         # Drop duplicates
         invoice_df = invoice_df.drop_duplicates(subset=primary_keys)
+        if self.key_normalization:
+            # Las llaves ya quedaron sin espacios: se reutilizan como llave normalizada
+            invoice_df = invoice_df.assign(**{f"{self.KEY_PREFIX}{col}": invoice_df[col] for col in primary_keys})
 
         # 🔍 Debug again
         if debug_ref in invoice_df['Referencia'].values:
@@ -305,17 +710,59 @@ class DataIntegration:
         else:
             print(f"❌ {debug_ref} missing AFTER drop_duplicates")
 
-        if self.order_df is not None: 
-            print(f"🔍 Validando facturas VS órdenes de suministro...")
-            invoice_order_validation = {
-                'left': ['Referencia', 'Total'],
-                'right': ['numero_orden_suministro', 'Importe'],
-                'return': ['orden_remision']
-            }
-            invoice_df = self.populate_df(invoice_df, self.order_df, invoice_order_validation)
+        if validate_orders and self.order_df is not None: 
+            invoice_df = self.validate_invoices(invoice_df, self.order_df)
 
         return invoice_df
 
+    def validate_invoices(self, invoice_df, order_df):
+        print(f"🔍 Validando facturas VS órdenes de suministro...")
+        invoice_order_validation = {
+            'left': ['Referencia', 'Total'],
+            'right': ['numero_orden_suministro', 'Importe'],
+            'return': ['orden_remision']
+        }
+        return self.populate_df(invoice_df, order_df, invoice_order_validation)
+
+
+    @staticmethod
+    def normalize_key(series):
+        """Llave sin espacios; los nulos se conservan y las columnas numéricas no se tocan."""
+        if pd.api.types.is_numeric_dtype(series):
+            return series
+        return series.astype(str).str.replace(r"\s+", "", regex=True).where(series.notna())
+
+    def _encode_keys(self, normalized):
+        """Códigos enteros estables dentro del proceso (vocabulario compartido por todos los DataFrames)."""
+        new_values = pd.Index(normalized.dropna().unique()).difference(self._key_vocabulary)
+        if len(new_values):
+            self._key_vocabulary = self._key_vocabulary.append(new_values)
+        return pd.Series(self._key_vocabulary.get_indexer(normalized), index=normalized.index)
+
+    def key_columns(self, df, cols):
+        """
+        Devuelve los nombres de columna a usar como llave de join para cols. Las
+        llaves de texto se normalizan (y codifican si integration_key_codes) en una
+        columna auxiliar que se agrega a df la primera vez; las siguientes llamadas
+        sobre el mismo DataFrame (o sus derivados por merge) la reutilizan.
+        """
+        names = []
+        for col in cols:
+            if pd.api.types.is_numeric_dtype(df[col]):
+                names.append(col)
+                continue
+            key_name = f"{self.KEY_PREFIX}{col}"
+            if key_name not in df.columns:
+                with pd.option_context('mode.chained_assignment', None):
+                    df[key_name] = self.normalize_key(df[col])
+            if self.key_codes:
+                code_name = f"{self.CODE_PREFIX}{col}"
+                if code_name not in df.columns:
+                    with pd.option_context('mode.chained_assignment', None):
+                        df[code_name] = self._encode_keys(df[key_name])
+                key_name = code_name
+            names.append(key_name)
+        return names
 
     def populate_df(self, left_df, right_df, query_dict):
         """
@@ -328,6 +775,7 @@ class DataIntegration:
                 'return': ['colX_right', 'colY_right']
             }
         """
+        started = time.perf_counter()
         left_keys = query_dict['left']
         right_keys = query_dict['right']
         return_cols = query_dict['return']
@@ -339,30 +787,47 @@ class DataIntegration:
         missing_left = [col for col in left_keys if col not in left_df.columns]
         if missing_left:
             print(f"⚠️ Columnas faltantes en left_df: {', '.join(missing_left)}. No se puede proceder con el merge.")
+            self.record_join_metrics(query_dict, left_df, right_df, 'missing_left_keys', started)
             return left_df
 
         # Validación de existencia de columnas en right_df para keys
         missing_right_keys = [col for col in right_keys if col not in right_df.columns]
         if missing_right_keys:
             print(f"⚠️ Columnas faltantes en right_df para keys: {', '.join(missing_right_keys)}. No se puede proceder con el merge.")
+            self.record_join_metrics(query_dict, left_df, right_df, 'missing_right_keys', started)
             return left_df
 
         # Validación de existencia de columnas en right_df para return
         missing_return = [col for col in return_cols if col not in right_df.columns]
         if missing_return:
             print(f"⚠️ Columnas faltantes en right_df para return: {', '.join(missing_return)}. No se puede proceder con el merge.")
+            self.record_join_metrics(query_dict, left_df, right_df, 'missing_return_cols', started)
             return left_df
 
+        # Llaves de join: normalizadas una sola vez por DataFrame y reutilizadas en cada llamada
+        left_on, right_on, drop_keys = left_keys, right_keys, right_keys
+        if self.key_normalization:
+            left_on = self.key_columns(left_df, left_keys)
+            right_on = self.key_columns(right_df, right_keys)
+            drop_keys = [col for col in right_on if col not in left_on]
+            if self.key_codes:
+                # Código -1 = llave nula; se excluye igual que groupby excluye NaN
+                valid = pd.Series(True, index=right_df.index)
+                for col in right_on:
+                    if col.startswith(self.CODE_PREFIX):
+                        valid &= right_df[col] >= 0
+                right_df = right_df[valid]
+
         # Índice compuesto para búsquedas rápidas
-        right_index = right_df.groupby(right_keys)[return_cols].agg(lambda x: ','.join(x.astype(str))).reset_index()
+        right_index = right_df.groupby(right_on)[return_cols].agg(lambda x: ','.join(x.astype(str))).reset_index()
 
         # Hacer merge left→right (left join)
         merged = pd.merge(
             left_df,
             right_index,
             how="left",
-            left_on=left_keys,
-            right_on=right_keys,
+            left_on=left_on,
+            right_on=right_on,
             suffixes=('', '_right'),
             indicator=True
         )
@@ -380,15 +845,17 @@ class DataIntegration:
                 merged[col] = merged[col].fillna("no localizado")
 
         # Eliminar columnas auxiliares de join (las right_keys y el indicador)
-        merged = merged.drop(columns=right_keys + ["_merge"], errors="ignore")
+        merged = merged.drop(columns=list(drop_keys) + ["_merge"], errors="ignore")
         # Rellenar NaN con "no localizado"
         for col in return_cols:
             if col in merged.columns:
                 merged[col] = merged[col].fillna("no localizado")
 
         # Eliminar columnas auxiliares de join (las right_keys)
-        merged = merged.drop(columns=right_keys, errors="ignore")
+        merged = merged.drop(columns=drop_keys, errors="ignore")
 
+        self.record_join_metrics(query_dict, left_df, right_df, 'ok', started, merged,
+                                 left_unmatched, len(right_index))
 
         return merged
 
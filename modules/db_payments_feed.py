@@ -8,6 +8,7 @@ from pandas._libs.tslibs.nattype import NaTType
 from colorama import Fore, Style, init
 import platform
 import subprocess
+from modules.excel_io import ExcelReader
 
 class DB_PAYMENTS_FEED:
     def __init__(self, working_folder, data_access):
@@ -15,6 +16,7 @@ class DB_PAYMENTS_FEED:
         print("Initializing DB_PAYMENTS_FEED...")
         self.working_folder = working_folder
         self.data_access = data_access
+        self.excel_reader = ExcelReader.from_config(data_access)
 
     def menu_db_payments_feed(self):
         print("Actualizando relación de UUID pagados por la Oficina de atención a proveedores...")
@@ -255,34 +257,33 @@ class DB_PAYMENTS_FEED:
             print(f"\n📄 Procesando archivo: {file}")
 
             # --- NUEVA LÓGICA DE REINTENTO ---
+            # Regex para folio fiscal
+            folio_pattern = re.compile(r"folio\s*fiscal", re.IGNORECASE)
+
+            def is_payments_header(row_index, values):
+                # Convertimos la fila a strings limpios y minúsculas
+                row_values = [str(val).strip().lower() for val in values]
+
+                # Chequeos
+                has_folio = any(folio_pattern.search(val) for val in row_values)
+                has_ref = "referencia" in row_values
+                has_importe = "importe" in row_values
+                has_clc = 'clc'in row_values
+
+                # Buscamos la fila que contenga LOS CUATRO elementos
+                return has_folio and has_ref and has_importe and has_clc
+
             while True:
-                # 1. Leer preview para buscar cabeceras
+                # 1. Leer el archivo una vez y buscar cabeceras en las primeras 30 filas
                 try:
-                    preview = pd.read_excel(full_path, header=None, nrows=30)
+                    df, header_row = self.excel_reader.read_locating_header(
+                        full_path, is_payments_header, search_rows=30
+                    )
                 except Exception as e:
                     print(f"   ❌ Error leyendo archivo: {e}")
+                    header_row = None
                     break # Salir si el archivo está corrupto o ilegible
 
-                header_row = None
-                
-                # Regex para folio fiscal
-                folio_pattern = re.compile(r"folio\s*fiscal", re.IGNORECASE)
-                
-                # Buscamos la fila que contenga LOS TRES elementos
-                for i in range(preview.shape[0]):
-                    # Convertimos la fila a strings limpios y minúsculas
-                    row_values = preview.iloc[i].astype(str).str.strip().str.lower().tolist()
-                    
-                    # Chequeos
-                    has_folio = any(folio_pattern.search(val) for val in row_values)
-                    has_ref = "referencia" in row_values
-                    has_importe = "importe" in row_values
-                    has_clc = 'clc'in row_values
-
-                    if has_folio and has_ref and has_importe and has_clc:
-                        header_row = i
-                        break
-
                 # 2. Si encontramos el header, rompemos el bucle while y seguimos
                 if header_row is not None:
                     print(f"   ✔ Header encontrado en fila: {header_row}")
@@ -315,9 +316,7 @@ class DB_PAYMENTS_FEED:
             if header_row is None:
                 continue
 
-            # Cargar DataFrame definitivo
-            df = pd.read_excel(full_path, header=header_row)
-
+            # El DataFrame definitivo ya viene de la misma lectura
             # Normalizar columnas
             df.columns = [self._normalize_identifier(c) for c in df.columns]
 
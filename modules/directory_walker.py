@@ -0,0 +1,92 @@
+import os
+import json
+from modules.helpers import atomic_write_json
+
+
+class IncrementalWalker:
+    """
+    Recorrido recursivo de carpetas con caché del árbol en JSON.
+
+    Por cada carpeta guarda su mtime, subcarpetas y archivos. El mtime de una
+    carpeta cambia cuando se agregan, borran o renombran entradas directas, así
+    que en las corridas siguientes solo se vuelven a listar las carpetas cuyo
+    mtime cambió; las demás cuestan un stat. Las carpetas sincronizadas de
+    Dropbox suelen cambiar solo en el mes en curso.
+    """
+
+    def __init__(self, cache_file):
+        self.cache_file = cache_file
+        self.tree = {}
+        self.listed = 0
+        self.reused = 0
+        if os.path.exists(cache_file):
+            try:
+                with open(cache_file, "r", encoding="utf-8") as f:
+                    self.tree = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"⚠️ No se pudo leer la caché de carpetas {os.path.basename(cache_file)}: {e}")
+
+    def files(self, root, extensions):
+        """
+        Rutas absolutas de los archivos bajo root con alguna de las extensiones
+        (sin distinguir mayúsculas), en orden de recorrido en profundidad.
+        """
+        extensions = tuple(ext.lower() for ext in ([extensions] if isinstance(extensions, str) else extensions))
+        root = os.path.abspath(root)
+        previous = self.tree.get(root, {})
+        current = {}
+        found = []
+
+        stack = [root]
+        while stack:
+            folder = stack.pop()
+            try:
+                mtime_ns = os.stat(folder).st_mtime_ns
+            except OSError as e:
+                print(f"⚠️ No se pudo leer la carpeta {folder}: {e}")
+                continue
+
+            entry = previous.get(folder)
+            if entry is None or entry['mtime_ns'] != mtime_ns:
+                entry = self._list(folder, mtime_ns)
+                if entry is None:
+                    continue
+                self.listed += 1
+            else:
+                self.reused += 1
+
+            current[folder] = entry
+            found.extend(os.path.join(folder, name) for name in entry['files'] if name.lower().endswith(extensions))
+            stack.extend(os.path.join(folder, name) for name in reversed(entry['dirs']))
+
+        # Solo se conservan las carpetas que siguen existiendo
+        self.tree[root] = current
+        return found
+
+    @staticmethod
+    def _list(folder, mtime_ns):
+        dirs, files = [], []
+        try:
+            with os.scandir(folder) as it:
+                for entry in it:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            dirs.append(entry.name)
+                        elif entry.is_file():
+                            files.append(entry.name)
+                    except OSError:
+                        continue
+        except OSError as e:
+            print(f"⚠️ No se pudo listar la carpeta {folder}: {e}")
+            return None
+        # El mtime se toma antes de listar: si la carpeta cambia mientras tanto,
+        # la siguiente corrida la vuelve a listar
+        return {'mtime_ns': mtime_ns, 'dirs': sorted(dirs), 'files': sorted(files)}
+
+    def save(self):
+        atomic_write_json(self.cache_file, self.tree)
+
+    def print_stats(self):
+        """Muestra las carpetas recorridas desde la última llamada y reinicia los contadores."""
+        print(f"🗂️ Carpetas → listadas: {self.listed}, sin cambios: {self.reused}")
+        self.listed = self.reused = 0
@@ -3,15 +3,35 @@ import yaml
 import pandas as pd
 import datetime
 import platform
-import hashlib
 import csv
+import io
+import time
+import contextlib
+import concurrent.futures
 from io import StringIO
+from modules.artifact_catalog import ArtifactCatalog
+from modules.helpers import file_sha256, worker_count
+from modules.excel_io import ExcelReader, ExcelOutput
+
+
+def _extract_file_worker(manager, file):
+    # Los mensajes se capturan y el llamador los imprime en el orden de los archivos
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()) as messages:
+        frames = manager._extract_file(file)
+    return frames, messages.getvalue(), time.perf_counter() - start
 
 
 class DownloadedFilesManager:
+    # Categoría del catálogo de artefactos para cada sesión de descarga
+    CATALOG_CATEGORIES = {'CAMUNDA': 'Ordenes', 'SAGI': 'SAGI'}
+
     def __init__(self, working_folder, data_access):
         self.working_folder = working_folder
         self.data_access = data_access
+        self.catalog = ArtifactCatalog(working_folder)
+        self.excel_reader = ExcelReader.from_config(data_access)
+        self.excel_output = ExcelOutput.from_config(data_access)
 
     def manage_downloaded_files(self, path_input, steps):
         #print("steps\n", steps)
@@ -28,6 +48,8 @@ class DownloadedFilesManager:
                 creation_date = self.get_file_creation_date(file_path).date()
                 if creation_date == today:
                     files_today.append(file_path)
+        # Misma descarga repetida: se parsea solo una copia por contenido
+        files_today, duplicates = self._dedupe_files(files_today)
         # Files_today tiene los archivos descargados de hoy 
         # Generamos las matrices por tipo de archivo
         csv = []
@@ -40,25 +62,130 @@ class DownloadedFilesManager:
                 xls.append(file)
             elif file.lower().endswith('.xlsx'):
                 xlsx.append(file)
-        # Cargar dataframes para cada tipo
-        csv_dfs = self.extract_dataframes(csv)
+        # CSV: fusión por bloques directo al xlsx, sin cargar los archivos completos
+        if self.merge_csv_files(csv, path_input, steps):
+            for file in csv:
+                self._remove_with_duplicates(file, duplicates)
+        # Cargar dataframes para los Excel
         xls_dfs = self.extract_dataframes(xls)
         xlsx_dfs = self.extract_dataframes(xlsx)
-        if csv_dfs: 
-            self.concatenate_dfs(csv_dfs, path_input, steps)
-            for file in csv:
-                os.remove(file)
         if xls_dfs:
             self.concatenate_dfs(xls_dfs, path_input, steps)
             for file in xls:
-                os.remove(file)
+                self._remove_with_duplicates(file, duplicates)
         if xlsx_dfs:
             self.concatenate_dfs(xlsx_dfs, path_input, steps)
             for file in xlsx:
-                os.remove(file)
+                self._remove_with_duplicates(file, duplicates)
         print("✅ Proceso de fusión y renombre de archivos descargados completado.\n")
         print("Se fusionan archivos siempre que sean del mismo día, mismos encabezados, contenido distinto")
 
+    def merge_csv_files(self, file_list, path_input, steps):
+        """
+        Fusiona los CSV con el mismo encabezado (mismo criterio que
+        concatenate_dfs) leyéndolos por bloques de `csv_chunk_rows` filas y
+        agregando cada bloque al xlsx de salida en modo write-only, así la
+        memoria no crece con el tamaño de los archivos. Devuelve True si se
+        guardó algún archivo.
+        """
+        if not file_list:
+            return False
+
+        # 1. Solo los encabezados, para agrupar sin leer los datos
+        groups = {}
+        for file in file_list:
+            try:
+                columns = self._clean_columns(self._read_csv(file, nrows=0)).columns.tolist()
+            except Exception as e:
+                print(f"❌ Error al procesar {file}: {e}")
+                continue
+            if columns:
+                # Las columnas salen en el orden del primer archivo del grupo, como en pd.concat
+                group = groups.setdefault(tuple(sorted(columns)), {'columns': columns, 'files': []})
+                group['files'].append(file)
+
+        today = datetime.date.today()
+        current_hour = datetime.datetime.now().hour
+        date_obj = datetime.datetime.combine(today, datetime.time(hour=current_hour))
+        date_str = self.format_date_for_filename(date_obj)
+        base_path = os.path.join(path_input, '..')
+
+        # 2. Cada grupo a un archivo parcial; los grupos sin filas no generan archivo.
+        # La extensión .partial evita que el catálogo o la carga de .xlsx los tomen
+        # como exportaciones si el proceso se interrumpe; ante un error se borran.
+        partials = []
+        partial_path = None
+        try:
+            for i, group in enumerate(groups.values()):
+                partial_path = os.path.join(base_path, f'{date_str}h {steps}_{i}.xlsx.partial')
+                stats = self.excel_output.write_chunks(
+                    partial_path, group['columns'], self._csv_group_chunks(group['columns'], group['files'])
+                )
+                if stats['rows']:
+                    partials.append((partial_path, stats['rows']))
+                else:
+                    os.remove(partial_path)
+                partial_path = None
+        except BaseException:
+            for path in [p for p, _ in partials] + ([partial_path] if partial_path else []):
+                if os.path.exists(path):
+                    os.remove(path)
+            raise
+
+        # 3. Nombres finales, igual que concatenate_dfs
+        for i, (partial_path, rows) in enumerate(partials):
+            filename = f'{date_str}h {steps}_{i}.xlsx' if len(partials) > 1 else f'{date_str}h {steps}.xlsx'
+            save_path = os.path.join(base_path, filename)
+            os.replace(partial_path, save_path)
+            print(f"✅ Guardado: {save_path} ({rows} filas)")
+            self.catalog.register(self.CATALOG_CATEGORIES.get(steps, steps), save_path)
+        return bool(partials)
+
+    def _csv_group_chunks(self, columns, file_list):
+        """Bloques de los CSV de un grupo con las columnas en el orden de `columns`."""
+        chunk_rows = int(self.data_access.get('csv_chunk_rows', 50_000))
+        seen = set() if self.data_access.get('dedupe_downloaded_rows', False) else None
+        duplicated = 0
+
+        def unseen(chunk):
+            # Con dedupe_downloaded_rows: quita filas ya escritas en el grupo
+            nonlocal duplicated
+            if seen is None:
+                return chunk
+            row_hashes = pd.util.hash_pandas_object(chunk, index=False)
+            keep = ~row_hashes.duplicated() & ~row_hashes.isin(seen)
+            seen.update(row_hashes[keep])
+            duplicated += int((~keep).sum())
+            return chunk.loc[keep]
+
+        for file in file_list:
+            start = time.perf_counter()
+            rows = 0
+            # Un archivo con solo filas vacías se descarta completo (como _clean_df);
+            # esas filas se retienen hasta ver una con datos
+            pending = []
+            try:
+                with self._read_csv(file, chunksize=chunk_rows) as reader:
+                    for chunk in reader:
+                        chunk = self._clean_columns(chunk)[columns]
+                        if pending is not None:
+                            if chunk.dropna(how="all").empty:
+                                pending.append(chunk)
+                                continue
+                            for blank in pending:
+                                blank = unseen(blank)
+                                rows += len(blank)
+                                yield blank
+                            pending = None
+                        chunk = unseen(chunk)
+                        rows += len(chunk)
+                        yield chunk
+            except Exception as e:
+                print(f"❌ Error al procesar {file}: {e}")
+            print(f"⏱️ {os.path.basename(file)}: {rows} filas en {time.perf_counter() - start:.2f} s")
+        if duplicated:
+            print(f"🧹 {duplicated} fila(s) duplicada(s) eliminadas")
+
     def concatenate_dfs(self, df_list, path_input, steps):
         if not df_list:
             return
@@ -80,14 +207,17 @@ class DownloadedFilesManager:
         base_path = os.path.join(path_input, '..')
         
         for i, (cols, dfs) in enumerate(groups.items()):
-            # 🔑 Siempre concatenar, sin borrar duplicados
+            # 🔑 Siempre concatenar; las filas repetidas solo se quitan con dedupe_downloaded_rows
             result_df = pd.concat(dfs, ignore_index=True, sort=False)
+            if self.data_access.get('dedupe_downloaded_rows', False):
+                result_df = self._drop_duplicate_rows(result_df)
 
             # Guardar archivo
             filename = f'{date_str}h {steps}_{i}.xlsx' if len(groups) > 1 else f'{date_str}h {steps}.xlsx'
             save_path = os.path.join(base_path, filename)
-            result_df.to_excel(save_path, index=False)
+            self.excel_output.write(save_path, {"Sheet1": result_df})
             print(f"✅ Guardado: {save_path} ({len(result_df)} filas)")
+            self.catalog.register(self.CATALOG_CATEGORIES.get(steps, steps), save_path)
         
 
     def extract_dataframes(self, file_list):
@@ -95,81 +225,145 @@ class DownloadedFilesManager:
         - CSV: respeta comas escapadas con '\,' (escapechar='\\'), BOM utf-8-sig.
         - XLSX: lee todas las hojas; agrega un DF por hoja no vacía.
         - XLS: usa self.XLS_header_location(file). Acepta DF o dict de DFs.
+        Con varios archivos se parsean en procesos (extract_workers en
+        config.yaml, entero o 'auto'); el orden de los DataFrames es el de file_list
+        y se reporta el tiempo de cada archivo.
         """
-        def _clean_df(df: pd.DataFrame) -> pd.DataFrame | None:
-            if df is None:
-                return None
-            # Normaliza encabezados y elimina columnas 'Unnamed'
-            df.columns = (pd.Index(df.columns)
-                        .astype(str)
-                        .str.replace(r"\s+", " ", regex=True)
-                        .str.strip())
-            df = df.loc[:, ~df.columns.str.match(r"^Unnamed(\s*:\s*\d+)?$")]
-            # Opcional: descartar hojas completamente vacías
-            if df.empty or df.dropna(how="all").empty:
-                return None
-            return df
-
         dataframes: list[pd.DataFrame] = []
         if not file_list:
             return dataframes
 
-        for file in file_list:
-            file_type = os.path.splitext(file)[1].lower().lstrip('.')
-            try:
-                if file_type == 'csv':
-                    df = pd.read_csv(
-                        file,
-                        sep=",",
-                        engine="c",
-                        encoding="utf-8-sig",
-                        quotechar='"',           # ✅ interpret quoted text correctly
-                        escapechar="\\",
-                        na_values=["\\N"],
-                        dtype=str,
-                        on_bad_lines="skip"
-                    )
-                    df = _clean_df(df)
-                    if df is not None:
-                        dataframes.append(df)
-                elif file_type == 'xlsx':
-                    with pd.ExcelFile(file) as xls:
-                        for sheet in xls.sheet_names:
-                            dfx = pd.read_excel(xls, sheet_name=sheet, dtype=str)
-                            dfx = _clean_df(dfx)
-                            if dfx is not None:
-                                dataframes.append(dfx)
-
-                elif file_type == 'xls':
-                    # XLS: tu función especializada (puede devolver DF o dict de DFs)
-                    out = self.XLS_header_location(file)
-                    if isinstance(out, dict):
-                        for dfx in out.values():
-                            dfx = _clean_df(dfx)
-                            if dfx is not None:
-                                dataframes.append(dfx)
-                    else:
-                        dfx = _clean_df(out)
-                        if dfx is not None:
-                            dataframes.append(dfx)
+        for file, (frames, messages, seconds) in zip(file_list, self._extract_files(file_list)):
+            print(messages, end="")
+            rows = sum(len(df) for df in frames)
+            print(f"⏱️ {os.path.basename(file)}: {len(frames)} tabla(s), {rows} filas en {seconds:.2f} s")
+            dataframes.extend(frames)
 
-                else:
-                    print(f"⚠️ Formato no soportado: {file}")
+        return dataframes
 
-            except Exception as e:
-                print(f"❌ Error al procesar {file}: {e}")
-                # continúa con el siguiente archivo
+    def _extract_files(self, file_list):
+        """Produce (frames, mensajes, segundos) por archivo, en el orden de file_list."""
+        workers = self._extract_workers(file_list)
+        if workers == 1:
+            for file in file_list:
+                yield _extract_file_worker(self, file)
+            return
+        print(f"⚙️ Parseando {len(file_list)} archivos en {workers} procesos")
+        with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+            yield from executor.map(_extract_file_worker, [self] * len(file_list), file_list)
 
-        return dataframes
+    def _extract_workers(self, file_list):
+        configured = self.data_access.get('extract_workers', 'auto')
+        if configured == 'auto':
+            # El parser C de CSV es más rápido que enviar los DataFrames entre
+            # procesos; en 'auto' solo se paraleliza la lectura de Excel
+            if all(file.lower().endswith('.csv') for file in file_list):
+                return 1
+        return worker_count(configured, len(file_list), 'extract_workers')
+
+    @staticmethod
+    def _read_csv(file, **kwargs):
+        return pd.read_csv(
+            file,
+            sep=",",
+            engine="c",
+            encoding="utf-8-sig",
+            quotechar='"',           # ✅ interpret quoted text correctly
+            escapechar="\\",
+            na_values=["\\N"],
+            dtype=str,
+            on_bad_lines="skip",
+            **kwargs
+        )
+
+    @staticmethod
+    def _clean_columns(df: pd.DataFrame) -> pd.DataFrame:
+        # Normaliza encabezados y elimina columnas 'Unnamed'
+        df.columns = (pd.Index(df.columns)
+                    .astype(str)
+                    .str.replace(r"\s+", " ", regex=True)
+                    .str.strip())
+        return df.loc[:, ~df.columns.str.match(r"^Unnamed(\s*:\s*\d+)?$")]
+
+    @classmethod
+    def _clean_df(cls, df: pd.DataFrame) -> pd.DataFrame | None:
+        if df is None:
+            return None
+        df = cls._clean_columns(df)
+        # Opcional: descartar hojas completamente vacías
+        if df.empty or df.dropna(how="all").empty:
+            return None
+        return df
+
+    def _extract_file(self, file):
+        """DataFrames no vacíos de un archivo; los errores se reportan y dan lista vacía."""
+        frames = []
+        file_type = os.path.splitext(file)[1].lower().lstrip('.')
+        try:
+            if file_type == 'csv':
+                frames.append(self._read_csv(file))
+            elif file_type == 'xlsx':
+                with self.excel_reader.excel_file(file) as xls:
+                    for sheet in xls.sheet_names:
+                        frames.append(pd.read_excel(xls, sheet_name=sheet, dtype=str))
+
+            elif file_type == 'xls':
+                # XLS: tu función especializada (puede devolver DF o dict de DFs)
+                out = self.XLS_header_location(file)
+                frames.extend(out.values() if isinstance(out, dict) else [out])
 
+            else:
+                print(f"⚠️ Formato no soportado: {file}")
 
+        except Exception as e:
+            print(f"❌ Error al procesar {file}: {e}")
+            # continúa con el siguiente archivo
+            return []
 
-    def _file_sha256(self, file_path, chunk_size=65536):
-        sha256 = hashlib.sha256()
-        with open(file_path, 'rb') as f:
-            for chunk in iter(lambda: f.read(chunk_size), b''):
-                sha256.update(chunk)
-        return sha256.hexdigest()
+        frames = [self._clean_df(df) for df in frames]
+        return [df for df in frames if df is not None]
+
+    def _dedupe_files(self, file_list):
+        """
+        Agrupa los archivos por sha256 de su contenido. Devuelve la lista con
+        la primera copia de cada contenido y {archivo conservado: [copias]}.
+        """
+        unique, duplicates, seen = [], {}, {}
+        for file in file_list:
+            try:
+                digest = file_sha256(file)
+            except OSError as e:
+                print(f"⚠️ No se pudo calcular el hash de {os.path.basename(file)}: {e}")
+                unique.append(file)
+                continue
+            if digest in seen:
+                duplicates.setdefault(seen[digest], []).append(file)
+            else:
+                seen[digest] = file
+                unique.append(file)
+        skipped = sum(len(files) for files in duplicates.values())
+        if skipped:
+            print(f"🧹 {skipped} archivo(s) repetido(s) por contenido, se procesan {len(unique)} de {len(file_list)}")
+            for kept, copies in duplicates.items():
+                names = ', '.join(os.path.basename(f) for f in copies)
+                print(f"\t{os.path.basename(kept)} = {names}")
+        return unique, duplicates
+
+    @staticmethod
+    def _remove_with_duplicates(file, duplicates):
+        for path in [file, *duplicates.get(file, [])]:
+            os.remove(path)
+
+    @staticmethod
+    def _drop_duplicate_rows(df):
+        """Quita filas idénticas (hash por fila) que llegaron en archivos distintos."""
+        row_hashes = pd.util.hash_pandas_object(df, index=False)
+        keep = ~row_hashes.duplicated()
+        removed = int((~keep).sum())
+        if removed:
+            print(f"🧹 {removed} fila(s) duplicada(s) eliminadas de {len(df)}")
+            df = df.loc[keep].reset_index(drop=True)
+        return df
 
     def _normalize_cols(self, cols):
         def norm_one(x):
@@ -219,30 +413,25 @@ class DownloadedFilesManager:
         """
         columns_PREI = self.data_access['columns_PREI']
 
-        # Leer las primeras 11 filas (0-10) sin headers
-        df_raw = pd.read_excel(filepath, header=None, nrows=11)
-
-        header_row = None
-
-        # Buscar en cada fila (0-10) los headers que coincidan
-        for row_index in range(min(11, len(df_raw))):
-            potential_headers = df_raw.iloc[row_index].tolist()
+        def is_prei_header(row_index, values):
             # Limpiar valores None, NaN y convertir a string
-            potential_headers = [str(col).strip() if pd.notna(col) else '' for col in potential_headers]
+            potential_headers = [str(col).strip() if pd.notna(col) else '' for col in values]
             # Filtrar solo valores no vacíos
             potential_headers = [col for col in potential_headers if col != '' and col != 'nan']
 
             print(f"Fila {row_index}: {potential_headers}")
 
             # Verificar si coincide con columns_PREI
-            if potential_headers == columns_PREI:
-                header_row = row_index
-                print(f"Headers PREI encontrados en fila {row_index}")
-                break
+            return potential_headers == columns_PREI
+
+        # Una sola lectura: se buscan los headers en las filas 0-10 y el DataFrame
+        # se arma con las filas ya leídas
+        df_final, header_row = self.excel_reader.read_locating_header(
+            filepath, is_prei_header, search_rows=11
+        )
 
         if header_row is not None:
-            # Leer el archivo completo usando la fila correcta como header
-            df_final = pd.read_excel(filepath, header=header_row)
+            print(f"Headers PREI encontrados en fila {header_row}")
             print(f"DataFrame PREI creado con {len(df_final)} filas y columnas: {df_final.columns.tolist()}")
             return df_final
         else:
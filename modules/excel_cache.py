@@ -0,0 +1,196 @@
+import os
+import json
+import pickle
+import hashlib
+import pandas as pd
+
+
+class ExcelCache:
+    """
+    Caché en disco de libros Excel ya parseados.
+
+    Cada lectura se identifica por (ruta, hoja, fila de encabezado, argumentos,
+    tamaño, mtime): la primera vez se parsea con pandas y se guarda una copia
+    columnar (Parquet si pyarrow está disponible y el DataFrame lo permite;
+    pickle en otro caso). Las lecturas siguientes se sirven desde esa copia.
+    Si el libro cambia, cambia la llave y la entrada vieja termina expulsada
+    por LRU cuando se rebasa el límite de tamaño.
+    """
+
+    def __init__(self, cache_dir, max_bytes=1024 * 1024 * 1024, max_entries=2000):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.bypass = 0
+        self.evictions = 0
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    # ---- llaves ----
+
+    def _key(self, path, sheet_name, header, kwargs):
+        stat = os.stat(path)
+        payload = json.dumps([
+            os.path.abspath(path), repr(sheet_name), repr(header),
+            sorted((k, repr(v)) for k, v in kwargs.items()),
+            stat.st_size, stat.st_mtime_ns,
+        ])
+        return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _cacheable(path, sheet_name, kwargs):
+        if not isinstance(path, (str, os.PathLike)) or not os.path.isfile(path):
+            return False
+        # Varias hojas devuelven dict; los callables no tienen repr estable
+        if sheet_name is None or isinstance(sheet_name, list):
+            return False
+        return not any(callable(v) for v in kwargs.values())
+
+    # ---- lectura ----
+
+    def read_excel(self, path, sheet_name=0, header=0, **kwargs) -> pd.DataFrame:
+        """Equivalente a pd.read_excel(path, sheet_name, header, **kwargs) con caché."""
+        if not self._cacheable(path, sheet_name, kwargs):
+            self.bypass += 1
+            return pd.read_excel(path, sheet_name=sheet_name, header=header, **kwargs)
+
+        key = self._key(path, sheet_name, header, kwargs)
+        df = self._load(key)
+        if df is not None:
+            self.hits += 1
+            return df
+
+        self.misses += 1
+        df = pd.read_excel(path, sheet_name=sheet_name, header=header, **kwargs)
+        self._store(key, df)
+        return df
+
+    def sheet_names(self, path) -> list:
+        """Nombres de hoja del libro, guardados junto a las entradas de datos."""
+        key = self._key(path, "__sheet_names__", None, {})
+        entry = os.path.join(self.cache_dir, f"{key}.json")
+        try:
+            with open(entry, "r", encoding="utf-8") as f:
+                names = json.load(f)
+            self._touch(entry)
+            self.hits += 1
+            return names
+        except (OSError, ValueError):
+            pass
+
+        self.misses += 1
+        with pd.ExcelFile(path) as xls:
+            names = list(xls.sheet_names)
+        self._atomic_write(entry, json.dumps(names, ensure_ascii=False).encode("utf-8"))
+        return names
+
+    # ---- almacenamiento ----
+
+    def _entry_paths(self, key):
+        return (os.path.join(self.cache_dir, f"{key}.parquet"),
+                os.path.join(self.cache_dir, f"{key}.pkl"))
+
+    def _load(self, key):
+        parquet_path, pickle_path = self._entry_paths(key)
+        try:
+            if os.path.exists(parquet_path):
+                df = pd.read_parquet(parquet_path)
+                self._touch(parquet_path)
+                return df
+            if os.path.exists(pickle_path):
+                df = pd.read_pickle(pickle_path)
+                self._touch(pickle_path)
+                return df
+        except Exception as e:
+            # Entrada corrupta o expulsada por otro proceso: se vuelve a parsear
+            print(f"⚠️ Entrada de caché inválida {key[:10]}: {e}")
+        return None
+
+    def _store(self, key, df):
+        parquet_path, pickle_path = self._entry_paths(key)
+        stored = False
+        if all(isinstance(c, str) for c in df.columns) and df.columns.is_unique:
+            tmp_path = f"{parquet_path}.{os.getpid()}.tmp"
+            try:
+                df.to_parquet(tmp_path, index=False)
+                os.replace(tmp_path, parquet_path)
+                stored = True
+            except Exception:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+        if not stored:
+            self._atomic_write(pickle_path, pickle.dumps(df, protocol=pickle.HIGHEST_PROTOCOL))
+        self._evict()
+
+    def _atomic_write(self, path, data):
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def _touch(path):
+        # El mtime de la entrada funciona como marca de último acceso para LRU
+        try:
+            os.utime(path, None)
+        except OSError:
+            pass
+
+    def _evict(self):
+        entries = []
+        total = 0
+        with os.scandir(self.cache_dir) as it:
+            for entry in it:
+                if not entry.is_file() or entry.name.endswith(".tmp"):
+                    continue
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+
+        entries.sort()  # más antiguo primero
+        while entries and (total > self.max_bytes or len(entries) > self.max_entries):
+            _, size, path = entries.pop(0)
+            try:
+                os.remove(path)
+                self.evictions += 1
+            except OSError:
+                pass
+            total -= size
+
+    # ---- métricas ----
+
+    COUNTERS = ('hits', 'misses', 'bypass', 'evictions')
+
+    def counters(self) -> dict:
+        return {name: getattr(self, name) for name in self.COUNTERS}
+
+    def add_counters(self, delta):
+        """Suma contadores medidos en otro proceso (p. ej. un worker de load_and_concat)."""
+        for name, value in (delta or {}).items():
+            setattr(self, name, getattr(self, name) + value)
+
+    def stats(self) -> dict:
+        size = 0
+        count = 0
+        with os.scandir(self.cache_dir) as it:
+            for entry in it:
+                if entry.is_file() and not entry.name.endswith(".tmp"):
+                    count += 1
+                    size += entry.stat().st_size
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "bypass": self.bypass,
+            "evictions": self.evictions,
+            "entries": count,
+            "size_mb": round(size / (1024 * 1024), 2),
+        }
+
+    def print_stats(self):
+        s = self.stats()
+        print(f"🗃️ Caché Excel → hits: {s['hits']}, misses: {s['misses']}, sin caché: {s['bypass']}, "
+              f"expulsiones: {s['evictions']}, entradas: {s['entries']} ({s['size_mb']} MB)")
@@ -0,0 +1,288 @@
+import os
+import time
+import threading
+import tracemalloc
+import pandas as pd
+
+
+class ExcelReader:
+    """
+    Punto único para leer libros Excel con el motor elegido en config.yaml
+    (`excel_reader`):
+
+    - 'openpyxl': el de pandas por defecto; ya abre los .xlsx en modo
+      read-only (streaming), así que no guarda el libro completo en memoria.
+    - 'calamine': lector en Rust (paquete python-calamine), varias veces más
+      rápido en libros grandes; también lee .xls.
+    - 'auto' (por defecto): calamine si está instalado, si no openpyxl.
+
+    Los .xls con openpyxl se dejan al motor por defecto de pandas (xlrd).
+    """
+
+    ENGINES = ('auto', 'openpyxl', 'calamine')
+
+    def __init__(self, engine='auto'):
+        if engine not in self.ENGINES:
+            print(f"⚠️ excel_reader desconocido: {engine}, se usa 'auto'.")
+            engine = 'auto'
+        if engine in ('auto', 'calamine') and not self.calamine_available():
+            if engine == 'calamine':
+                print("⚠️ python-calamine no está instalado, se usa openpyxl para leer Excel.")
+            engine = 'openpyxl'
+        elif engine == 'auto':
+            engine = 'calamine'
+        self.engine = engine
+
+    @classmethod
+    def from_config(cls, data_access):
+        return cls((data_access or {}).get('excel_reader', 'auto'))
+
+    @staticmethod
+    def calamine_available() -> bool:
+        try:
+            import python_calamine  # noqa: F401
+            return True
+        except ImportError:
+            return False
+
+    def engine_for(self, path):
+        """Motor a usar para el archivo; None deja que pandas elija (p. ej. .xls con xlrd)."""
+        if self.engine == 'openpyxl' and isinstance(path, (str, os.PathLike)):
+            if os.fspath(path).lower().endswith('.xls'):
+                return None
+        return self.engine
+
+    def read_excel(self, path, sheet_name=0, **kwargs) -> pd.DataFrame:
+        if isinstance(path, pd.ExcelFile):
+            return pd.read_excel(path, sheet_name=sheet_name, **kwargs)
+        kwargs.setdefault('engine', self.engine_for(path))
+        return pd.read_excel(path, sheet_name=sheet_name, **kwargs)
+
+    def excel_file(self, path) -> pd.ExcelFile:
+        """Libro abierto una vez para varias lecturas (usar con `with`)."""
+        return pd.ExcelFile(path, engine=self.engine_for(path))
+
+    def sheet_names(self, path) -> list:
+        with self.excel_file(path) as xls:
+            return list(xls.sheet_names)
+
+    def read_locating_header(self, path, is_header, search_rows, sheet_name=0):
+        """
+        Lee la hoja una sola vez sin encabezados y busca en las primeras
+        `search_rows` filas la primera para la que is_header(fila, valores) es
+        verdadero. El DataFrame se arma con las filas ya leídas, igual que
+        read_excel(header=fila). Devuelve (DataFrame, fila) o (None, None).
+        """
+        raw = self.read_excel(path, sheet_name=sheet_name, header=None, dtype=object)
+        for row_index in range(min(search_rows, len(raw))):
+            if is_header(row_index, raw.iloc[row_index].tolist()):
+                return frame_from_header_row(raw, row_index), row_index
+        return None, None
+
+
+def frame_from_header_row(raw, header_row) -> pd.DataFrame:
+    """
+    DataFrame leído con header=None y dtype=object -> el mismo que con
+    header=header_row, pasando las filas por el TextParser que usa read_excel
+    (tipos, nombres 'Unnamed: n' y duplicados 'col.1'). dtype=object conserva
+    los valores de cada celda: sin él, una columna entera con celdas vacías
+    sobre el encabezado ya llega como float.
+    """
+    from pandas.io.parsers import TextParser
+
+    block = raw.iloc[header_row:].astype(object)
+    rows = block.where(block.notna(), None).values.tolist()
+    if not rows:
+        return pd.DataFrame()
+    rows[0] = ['' if value is None else value for value in rows[0]]
+    return TextParser(rows, header=0).read()
+
+
+def current_rss():
+    """Memoria residente del proceso en bytes, o None si no hay cómo medirla."""
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        pass
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+class MemoryPeak:
+    """
+    Pico de memoria durante un bloque `with`, en MB sobre el valor inicial.
+
+    - 'rss' (por defecto): muestrea la memoria residente del proceso en un hilo
+      cada `interval` segundos; costo despreciable. Usa psutil si está
+      instalado, /proc en Linux; si no hay cómo medir, el pico queda en None.
+    - 'tracemalloc': asignaciones de Python exactas, pero hace la escritura
+      varias veces más lenta; solo para diagnóstico.
+    - 'off': sin medición.
+    """
+
+    def __init__(self, mode='rss', interval=0.05):
+        self.mode = mode
+        self.interval = interval
+        self.peak_mb = None
+
+    def __enter__(self):
+        if self.mode == 'tracemalloc':
+            self._started_tracing = not tracemalloc.is_tracing()
+            if self._started_tracing:
+                tracemalloc.start()
+            tracemalloc.reset_peak()
+            self._baseline = tracemalloc.get_traced_memory()[0]
+        elif self.mode == 'rss':
+            self._baseline = current_rss()
+            if self._baseline is not None:
+                self._peak = self._baseline
+                self._stop = threading.Event()
+                self._thread = threading.Thread(target=self._sample, daemon=True)
+                self._thread.start()
+        return self
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            rss = current_rss()
+            if rss is not None and rss > self._peak:
+                self._peak = rss
+
+    def __exit__(self, *exc):
+        if self.mode == 'tracemalloc':
+            self.peak_mb = (tracemalloc.get_traced_memory()[1] - self._baseline) / (1024 * 1024)
+            if self._started_tracing:
+                tracemalloc.stop()
+        elif self.mode == 'rss' and self._baseline is not None:
+            self._stop.set()
+            self._thread.join()
+            self._peak = max(self._peak, current_rss() or 0)
+            self.peak_mb = (self._peak - self._baseline) / (1024 * 1024)
+        return False
+
+
+class ExcelOutput:
+    """
+    Escritura de libros Excel con métricas por archivo (tiempo y pico de
+    memoria, ver MemoryPeak).
+
+    Los libros con más de `excel_streaming_rows` filas (config.yaml, 50,000
+    por defecto) se escriben con openpyxl en modo write-only: las filas se
+    agregan por bloques de `chunk_rows` y se vuelcan al disco, en lugar de
+    construir todas las celdas en memoria como hace `to_excel`. Los libros
+    chicos siguen por `to_excel` para conservar su formato.
+    """
+
+    def __init__(self, streaming_rows=50_000, chunk_rows=10_000, memory='rss'):
+        self.streaming_rows = streaming_rows
+        self.chunk_rows = chunk_rows
+        self.memory = memory
+
+    @classmethod
+    def from_config(cls, data_access):
+        config = data_access or {}
+        return cls(
+            streaming_rows=int(config.get('excel_streaming_rows', 50_000)),
+            memory=config.get('excel_write_memory', 'rss'),
+        )
+
+    def write(self, path, sheets, skip_empty=False) -> dict:
+        """
+        Escribe {hoja: DataFrame} en path (sin índice). Con skip_empty se
+        omiten las hojas vacías. Devuelve las métricas de la escritura.
+        """
+        if skip_empty:
+            sheets = {name: df for name, df in sheets.items() if not df.empty}
+        total_rows = sum(len(df) for df in sheets.values())
+        streaming = total_rows > self.streaming_rows and all(
+            not isinstance(df.columns, pd.MultiIndex) for df in sheets.values()
+        )
+
+        start = time.perf_counter()
+        with MemoryPeak(self.memory) as memory:
+            if streaming:
+                self._write_streaming(path, sheets)
+            else:
+                self._write_pandas(path, sheets)
+        seconds = time.perf_counter() - start
+
+        return self._report(path, 'streaming' if streaming else 'to_excel', len(sheets), total_rows, seconds, memory)
+
+    @staticmethod
+    def _write_pandas(path, sheets):
+        with pd.ExcelWriter(path, engine='openpyxl') as writer:
+            for name, df in sheets.items():
+                df.to_excel(writer, sheet_name=name, index=False)
+
+    def write_chunks(self, path, columns, chunks, sheet_name="Sheet1") -> dict:
+        """
+        Escribe en modo write-only una hoja a partir de un iterable de
+        DataFrames con las columnas `columns`; cada bloque se vuelca al disco
+        antes de leer el siguiente. Devuelve las mismas métricas que write.
+        """
+        from openpyxl import Workbook
+
+        start = time.perf_counter()
+        total_rows = 0
+        with MemoryPeak(self.memory) as memory:
+            workbook = Workbook(write_only=True)
+            sheet = workbook.create_sheet(title=sheet_name)
+            self._append_header(sheet, columns)
+            for chunk in chunks:
+                for offset in range(0, len(chunk), self.chunk_rows):
+                    total_rows += self._append_rows(sheet, chunk.iloc[offset:offset + self.chunk_rows])
+            workbook.save(path)
+        seconds = time.perf_counter() - start
+
+        return self._report(path, 'streaming', 1, total_rows, seconds, memory)
+
+    @staticmethod
+    def _report(path, mode, n_sheets, total_rows, seconds, memory):
+        stats = {
+            'file': os.path.basename(path),
+            'mode': mode,
+            'sheets': n_sheets,
+            'rows': total_rows,
+            'seconds': round(seconds, 3),
+            'peak_mb': round(memory.peak_mb, 1) if memory.peak_mb is not None else None,
+        }
+        peak = f", pico de memoria +{stats['peak_mb']} MB" if memory.peak_mb is not None else ""
+        print(f"💾 {stats['file']}: {total_rows} filas en {n_sheets} hoja(s), "
+              f"{stats['seconds']} s ({mode}){peak}")
+        return stats
+
+    @staticmethod
+    def _append_header(sheet, columns):
+        from openpyxl.cell import WriteOnlyCell
+        from openpyxl.styles import Font
+
+        bold = Font(bold=True)
+        header = []
+        for column in columns:
+            cell = WriteOnlyCell(sheet, value=column)
+            cell.font = bold
+            header.append(cell)
+        sheet.append(header)
+
+    @staticmethod
+    def _append_rows(sheet, df):
+        chunk = df.astype(object)
+        for row in chunk.where(chunk.notna(), None).itertuples(index=False, name=None):
+            sheet.append(row)
+        return len(df)
+
+    def _write_streaming(self, path, sheets):
+        from openpyxl import Workbook
+
+        workbook = Workbook(write_only=True)
+        for name, df in sheets.items():
+            sheet = workbook.create_sheet(title=name)
+            self._append_header(sheet, df.columns)
+            for offset in range(0, len(df), self.chunk_rows):
+                self._append_rows(sheet, df.iloc[offset:offset + self.chunk_rows])
+        if not sheets:
+            workbook.create_sheet(title="Sheet1")
+        workbook.save(path)
@@ -17,6 +17,171 @@ from pathlib import Path
 import shutil
 from PyPDF2 import PdfReader
 import re
+import json
+from modules.artifact_catalog import ArtifactCatalog
+from modules.helpers import atomic_write_json, file_sha256, worker_count
+from modules.invoice_store import InvoiceStore
+from modules.directory_walker import IncrementalWalker
+from modules.pdf_index import PdfPrefixIndex
+from modules.excel_io import ExcelOutput
+
+
+XML_BATCH_SIZE = 256
+XML_MIN_FILES_FOR_PROCESSES = 500
+PDF_CHECKPOINT_EVERY = 200
+
+CFDI_NAMESPACES = {
+    "http://www.sat.gob.mx/cfd/3": {"cfdi": "http://www.sat.gob.mx/cfd/3", "tfd": "http://www.sat.gob.mx/TimbreFiscalDigital"},
+    "http://www.sat.gob.mx/cfd/4": {"cfdi": "http://www.sat.gob.mx/cfd/4", "tfd": "http://www.sat.gob.mx/TimbreFiscalDigital"},
+}
+
+
+def _compile_cfdi_xpaths(ns):
+    return {
+        'uuid': etree.XPath('string(./cfdi:Complemento/tfd:TimbreFiscalDigital/@UUID)', namespaces=ns),
+        'receptor': etree.XPath('./cfdi:Receptor', namespaces=ns),
+        'conceptos': etree.XPath('./cfdi:Conceptos/cfdi:Concepto', namespaces=ns),
+    }
+
+
+# XPath compilados una vez por proceso para CFDI 3.3 y 4.0
+CFDI_XPATHS = {url: _compile_cfdi_xpaths(ns) for url, ns in CFDI_NAMESPACES.items()}
+
+
+def _cfdi_xpaths(root_element):
+    xpaths = CFDI_XPATHS.get(etree.QName(root_element).namespace)
+    if xpaths is not None:
+        return xpaths
+    # Detectar namespace entre los declarados, como antes
+    for ns_url in root_element.nsmap.values():
+        if "cfd/3" in ns_url:
+            return CFDI_XPATHS["http://www.sat.gob.mx/cfd/3"]
+        elif "cfd/4" in ns_url:
+            return CFDI_XPATHS["http://www.sat.gob.mx/cfd/4"]
+    return None
+
+
+def parse_cfdi(full_path, file):
+    """
+    Lee un CFDI y devuelve (estado, uuid, folio, filas), con una fila por
+    concepto. El estado se registra en el manifiesto de XMLs.
+    """
+    try:
+        root_element = etree.parse(full_path).getroot()
+        xpaths = _cfdi_xpaths(root_element)
+        if xpaths is None:
+            return 'sin_namespace', None, None, []  # No procesar si no hay namespace válido
+
+        # Extraer Folio y Serie
+        folio = root_element.get('Folio')
+        serie = root_element.get('Serie')
+        folio_completo = f"{serie}-{folio}" if serie and folio else folio or serie or ""
+        fecha = root_element.get('Fecha')
+        uuid = xpaths['uuid'](root_element) or None
+
+        # Extraer receptor
+        rec = xpaths['receptor'](root_element)
+        if not rec:
+            return 'sin_receptor', uuid, folio_completo, []
+        nombre = rec[0].get('Nombre')
+        rfc = rec[0].get('Rfc')
+
+        conceptos_data = [
+            [uuid, folio_completo, fecha, nombre, rfc,
+             concepto.get('Descripcion'), concepto.get('Cantidad'), concepto.get('Importe'), file]
+            for concepto in xpaths['conceptos'](root_element)
+        ]
+        return 'procesado', uuid, folio_completo, conceptos_data
+
+    except Exception as e:
+        print(f"[ERROR] Al procesar {file}: {e}")
+        return 'error', None, None, []
+
+
+def read_acuse_status(pdf_path):
+    """
+    Lee un acuse de verificación del SAT y devuelve {'uuid', 'estado'}, o
+    {'error'} si el PDF no se pudo leer. Deja de extraer páginas en cuanto
+    tiene el UUID y el estado.
+    """
+    try:
+        reader = PdfReader(pdf_path)
+        text = ""
+        uuid = None
+        estado = "Desconocido"
+        for page in reader.pages:
+            text += page.extract_text() or ""
+
+            # Normalizar texto
+            clean_text = text.replace("\n", " ").replace("\r", " ")
+
+            # Regex tolerante: capturar entre &id= y &re= (puede cruzar páginas)
+            match = re.search(r"&id=([\s\S]+?)&re=", clean_text, re.IGNORECASE)
+            if match:
+                # limpiar espacios intermedios
+                uuid = match.group(1).replace(" ", "").replace("\n", "").replace("\r", "")
+
+            # Estado
+            if "Cancelado" in clean_text:
+                estado = "Cancelado"
+            elif "Vigente" in clean_text:
+                estado = "Vigente"
+
+            if uuid and estado != "Desconocido":
+                break
+        return {"uuid": uuid, "estado": estado}
+
+    except Exception as e:
+        print(f"❌ Error procesando {os.path.basename(pdf_path)}: {e}")
+        return {"error": str(e)}
+
+
+def _already_placed(src, dst, mode):
+    """True si dst ya tiene src colocado con el método pedido; si no, hay que volver a colocarlo."""
+    try:
+        src_stat, dst_stat = os.stat(src), os.lstat(dst)
+        if mode == 'symlink':
+            return os.path.islink(dst) and os.path.samefile(src, dst)
+    except OSError:
+        return False
+    if os.path.islink(dst):
+        return False
+    same_file = os.path.samestat(src_stat, dst_stat)
+    if mode == 'hardlink' and src_stat.st_dev == dst_stat.st_dev:
+        return same_file and dst_stat.st_nlink > 1
+    # copy (o hardlink entre unidades, que siempre termina en copia): una copia
+    # independiente con el mismo tamaño y mtime. copy2 conserva el mtime; se
+    # compara al milisegundo por la precisión de cada sistema de archivos
+    return (not same_file and src_stat.st_size == dst_stat.st_size
+            and src_stat.st_mtime_ns // 1_000_000 == dst_stat.st_mtime_ns // 1_000_000)
+
+
+def place_file(src, dst, mode='hardlink'):
+    """
+    Deja src disponible en dst según mode ('hardlink', 'symlink' o 'copy').
+    Si el enlace no es posible (otra unidad, permisos) se copia. Devuelve el
+    método usado, o 'sin cambios' si dst ya estaba colocado con ese mismo método
+    (al cambiar pdf_placement, las copias previas se reemplazan por enlaces).
+    """
+    if _already_placed(src, dst, mode):
+        return 'sin cambios'
+    if os.path.lexists(dst):
+        os.remove(dst)
+    if mode in ('hardlink', 'symlink'):
+        try:
+            if mode == 'hardlink':
+                os.link(src, dst)
+            else:
+                os.symlink(os.path.abspath(src), dst)
+            return mode
+        except OSError:
+            pass
+    shutil.copy2(src, dst)
+    return 'copy'
+
+
+def _parse_cfdi_batch(batch):
+    return [(full_path, file, parse_cfdi(full_path, file)) for full_path, file in batch]
 
 
 class FACTURAS:
@@ -24,7 +189,12 @@ class FACTURAS:
         self.working_folder = working_folder
         self.data_access = data_access
         self.helpers = helpers
-        
+        self.catalog = ArtifactCatalog(working_folder)
+        self.invoice_store = InvoiceStore(os.path.join(working_folder, "Facturas", "xmls_extraidos.db"))
+        # Árbol de carpetas de facturas compartido por la extracción de XML y el índice de PDFs
+        self.walker = IncrementalWalker(os.path.join(working_folder, ".cache", "directory_tree.json"))
+        self.excel_output = ExcelOutput.from_config(data_access)
+
     def cargar_facturas(self, facturas):
         facturas_folder = os.path.join(self.working_folder, "Facturas")
         os.makedirs(facturas_folder, exist_ok=True)
@@ -41,7 +211,7 @@ class FACTURAS:
         if not df_general.empty:
             today = datetime.datetime.today().strftime("%Y-%m-%d-%H")  # ✅ Formato de fecha corregido
             output_file = os.path.join(facturas_folder, f"{today}h_{facturas}.xlsx")  # ✅ Usar carpeta local
-            df_xmls = pd.read_excel(xlsx_database)
+            df_xmls = self.invoice_store.read()
             print(f"📊 Filas en df_xmls antes de limpiar: {df_xmls.shape[0]}")
 
             # Verificar duplicados por Folio
@@ -60,7 +230,7 @@ class FACTURAS:
             # --- Cargar estatus SAT y eliminar Cancelados ---
             invoice_to_check = os.path.join(self.working_folder, "Estatus SAT", "estatus_facturas.xlsx")
             if os.path.isfile(invoice_to_check):
-                df_status_SAT = pd.read_excel(invoice_to_check)
+                df_status_SAT = self.helpers.read_excel(invoice_to_check)
 
                 # Asegurarnos de que las columnas existan
                 if {'uuid', 'estado'}.issubset(df_status_SAT.columns):
@@ -84,12 +254,12 @@ class FACTURAS:
             # --- Guardar ---
 
             try:
-                with pd.ExcelWriter(output_file, engine="openpyxl") as writer:
-                    df_general.to_excel(writer, sheet_name="df_facturas", index=False)
-                    df_pagos.to_excel(writer, sheet_name="df_pagos", index=False)
+                self.excel_output.write(output_file, {"df_facturas": df_general, "df_pagos": df_pagos})
 
                 print(f"\n💾 Archivo guardado en {output_file}")
+                self.catalog.register("Facturas", output_file)
                 print(f"📊 Total de filas procesadas: {len(df_general)} en 'df_facturas' y {len(df_pagos)} en 'df_pagos'")
+                self.helpers.print_cache_stats()
                 return True
             except PermissionError as e:
                 print(f"❌ Error de permisos: {e}")
@@ -99,7 +269,7 @@ class FACTURAS:
                 import tempfile
                 temp_dir = tempfile.gettempdir()
                 fallback_file = os.path.join(temp_dir, f"{today}_facturas.xlsx")
-                df_general.to_excel(fallback_file, index=False)
+                self.excel_output.write(fallback_file, {"Sheet1": df_general})
                 print(f"💾 Archivo guardado en ubicación temporal: {fallback_file}")
 
                 return False
@@ -116,130 +286,123 @@ class FACTURAS:
             if os.path.exists(path):
                 invoice_paths.append(path)
 
-        # Cargar base existente si existe
-        if os.path.exists(xlsx_database):
-            df_database = pd.read_excel(xlsx_database)
-            existing_uuids = set(df_database['UUID'].dropna())  # Set de UUIDs existentes para check rápido
-            existing_folios_files = set(zip(df_database['Folio'], df_database['Archivo']))  # Para check alternativo
-        else:
-            df_database = pd.DataFrame(columns=[
-                'UUID', 'Folio', 'Fecha', 'Nombre', 'Rfc',
-                'Descripcion', 'Cantidad', 'Importe', 'Archivo'
-            ])
-            existing_uuids = set()
-            existing_folios_files = set()
+        # La base vive en SQLite; el xlsx histórico se migra la primera vez
+        self.invoice_store.migrate_from_xlsx(xlsx_database)
+        existing_uuids, existing_folios_files = self.invoice_store.known_keys()
 
         data = []
 
-        # Función para procesar un archivo XML (para paralelizar)
-        def process_xml_file(full_path, file):
-            try:
-                tree = etree.parse(full_path)
-                root_element = tree.getroot()
-
-                # Detectar namespace
-                ns = None
-                for ns_url in root_element.nsmap.values():
-                    if "cfd/3" in ns_url:
-                        ns = {
-                            "cfdi": "http://www.sat.gob.mx/cfd/3",
-                            "tfd": "http://www.sat.gob.mx/TimbreFiscalDigital"
-                        }
-                        break
-                    elif "cfd/4" in ns_url:
-                        ns = {
-                            "cfdi": "http://www.sat.gob.mx/cfd/4",
-                            "tfd": "http://www.sat.gob.mx/TimbreFiscalDigital"
-                        }
-                        break
-                if ns is None:
-                    return []  # No procesar si no hay namespace válido
-
-                # Extraer Folio y Serie
-                folio = root_element.get('Folio')
-                serie = root_element.get('Serie')
-                folio_completo = f"{serie}-{folio}" if serie and folio else folio or serie or ""
-
-                # Extraer Fecha
-                fecha = root_element.get('Fecha')
-
-                # Extraer UUID
-                uuid = None
-                complemento = root_element.find('./cfdi:Complemento', ns)
-                if complemento is not None:
-                    timbre = complemento.find('./tfd:TimbreFiscalDigital', ns)
-                    if timbre is not None:
-                        uuid = timbre.get('UUID')
-
-                # Check si ya existe
-                if uuid and uuid in existing_uuids:
-                    return []  # Omitir
-                elif (folio_completo, file) in existing_folios_files:
-                    return []  # Omitir
-
-                # Extraer receptor
-                rec = root_element.find('./cfdi:Receptor', ns)
-                if rec is None:
-                    return []
-                nombre = rec.get('Nombre')
-                rfc = rec.get('Rfc')
-
-                # Extraer conceptos
-                conceptos_data = []
-                for concepto in root_element.findall('./cfdi:Conceptos/cfdi:Concepto', ns):
-                    descripcion = concepto.get('Descripcion')
-                    cantidad = concepto.get('Cantidad')
-                    importe = concepto.get('Importe')
-
-                    conceptos_data.append([
-                        uuid,
-                        folio_completo,
-                        fecha,
-                        nombre,
-                        rfc,
-                        descripcion,
-                        cantidad,
-                        importe,
-                        file
-                    ])
-
-                return conceptos_data
-
-            except Exception as e:
-                print(f"[ERROR] Al procesar {file}: {e}")
-                return []
+        # Manifiesto de XMLs ya vistos (ruta → tamaño, mtime, estado), junto a la base
+        manifest_file = os.path.join(os.path.dirname(xlsx_database), 'xml_manifest.json')
+        manifest = self.load_xml_manifest(manifest_file)
 
-        # Recopilar todos los archivos a procesar
+        # Recopilar los archivos nuevos o modificados; los que coinciden en
+        # tamaño y mtime con el manifiesto no se vuelven a abrir
         xml_files = []
+        seen = {}
+        unchanged = 0
         for folder in invoice_paths:
             print(f"\nExplorando carpeta: {folder}")
-            for root_dir, dirs, files in os.walk(folder):
-                for file in files:
-                    if file.endswith('.xml'):
-                        full_path = os.path.join(root_dir, file)
-                        xml_files.append((full_path, file))
-
-        # Procesar en paralelo usando ThreadPoolExecutor (para I/O bound)
-        with concurrent.futures.ThreadPoolExecutor(max_workers=4) as executor:  # Ajusta max_workers según tu CPU
-            futures = [executor.submit(process_xml_file, full_path, file) for full_path, file in xml_files]
-            for future in concurrent.futures.as_completed(futures):
-                result = future.result()
-                if result:
-                    data.extend(result)
-
-        # Si hay nuevos registros, agregarlos y guardar
+            for full_path in self.walker.files(folder, '.xml'):
+                file = os.path.basename(full_path)
+                # Un XML editado en su lugar no cambia el mtime de su carpeta: se compara el archivo
+                try:
+                    stat = os.stat(full_path)
+                except OSError as e:
+                    print(f"[ERROR] No se pudo leer {file}: {e}")
+                    continue
+                entry = manifest.get(full_path)
+                if entry and entry['size'] == stat.st_size and entry['mtime_ns'] == stat.st_mtime_ns:
+                    seen[full_path] = entry
+                    unchanged += 1
+                    continue
+                seen[full_path] = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+                xml_files.append((full_path, file))
+        self.walker.save()
+        self.walker.print_stats()
+        print(f"🗂️ Manifiesto XML: {unchanged} sin cambios, {len(xml_files)} nuevos o modificados por procesar")
+
+        status_counts = {}
+        for full_path, file, (status, uuid, folio_completo, result) in self.parse_xml_files(xml_files):
+            # Check si ya existe
+            if status == 'procesado' and (
+                (uuid and uuid in existing_uuids) or (folio_completo, file) in existing_folios_files
+            ):
+                status, result = 'existente', []
+            seen[full_path]['status'] = status
+            status_counts[status] = status_counts.get(status, 0) + 1
+            if result:
+                data.extend(result)
+        if status_counts:
+            print("📋 Resultado del parseo: " + ", ".join(f"{k}: {v}" for k, v in sorted(status_counts.items())))
+
+        # Si hay nuevos registros, agregarlos a la base
         if data:
-            df_nuevos = pd.DataFrame(data, columns=[
-                'UUID', 'Folio', 'Fecha', 'Nombre', 'Rfc',
-                'Descripcion', 'Cantidad', 'Importe', 'Archivo'
-            ])
-            df_database = pd.concat([df_database, df_nuevos], ignore_index=True)
-            df_database[['Cantidad', 'Importe']] = df_database[['Cantidad', 'Importe']].astype(float)
-            df_database.to_excel(xlsx_database, engine='openpyxl', index=False)
-            print(f"\n✅ Se agregaron {len(df_nuevos)} nuevos registros a {xlsx_database}")
+            df_nuevos = pd.DataFrame(data, columns=InvoiceStore.COLUMNS)
+            inserted = self.invoice_store.append(df_nuevos)
+            print(f"\n✅ Se agregaron {inserted} nuevos registros a {self.invoice_store.db_path}")
         else:
             print("\n✔️ No se encontraron nuevos XMLs para agregar.")
 
+        # Exportación opcional del inventario completo a Excel
+        if self.data_access.get('xml_export_xlsx', False) and (data or not os.path.exists(xlsx_database)):
+            self.invoice_store.export_xlsx(xlsx_database, self.excel_output)
+
+        # El manifiesto se guarda después de la base para no marcar como vistos
+        # XMLs cuyos registros no llegaron a escribirse
+        self.save_xml_manifest(manifest_file, manifest, seen, invoice_paths)
+
+    def _xml_workers(self):
+        """
+        Número de procesos para parsear XMLs según `xml_workers` en config.yaml
+        (entero o 'auto', por defecto todos los núcleos). Con 1 se usa el modo
+        anterior de hilos.
+        """
+        return worker_count(self.data_access.get('xml_workers', 'auto'), setting='xml_workers')
+
+    def parse_xml_files(self, xml_files):
+        """
+        Parsea [(ruta, archivo)] y produce (ruta, archivo, resultado de parse_cfdi).
+        El parseo es de CPU, así que se reparte en lotes entre procesos; pocos
+        archivos o xml_workers: 1 usan hilos dentro del proceso.
+        """
+        workers = self._xml_workers()
+        if workers == 1 or len(xml_files) < XML_MIN_FILES_FOR_PROCESSES:
+            with concurrent.futures.ThreadPoolExecutor(max_workers=4) as executor:
+                futures = {executor.submit(parse_cfdi, full_path, file): (full_path, file)
+                           for full_path, file in xml_files}
+                for future in concurrent.futures.as_completed(futures):
+                    yield (*futures[future], future.result())
+            return
+
+        # Lotes pequeños para repartir la carga, grandes para amortizar el envío
+        batch_size = max(1, min(XML_BATCH_SIZE, len(xml_files) // (workers * 4)))
+        batches = [xml_files[i:i + batch_size] for i in range(0, len(xml_files), batch_size)]
+        print(f"⚙️ Parseando {len(xml_files)} XMLs en {workers} procesos ({len(batches)} lotes de hasta {batch_size})")
+        with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+            for results in executor.map(_parse_cfdi_batch, batches):
+                yield from results
+
+    def load_xml_manifest(self, manifest_file):
+        if os.path.exists(manifest_file):
+            try:
+                with open(manifest_file, "r", encoding="utf-8") as f:
+                    return json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"⚠️ No se pudo leer el manifiesto {os.path.basename(manifest_file)}: {e}")
+        return {}
+
+    def save_xml_manifest(self, manifest_file, manifest, seen, invoice_paths):
+        """
+        Guarda las entradas vistas en esta corrida. Las de carpetas que hoy no
+        están disponibles (p. ej. una unidad de red desconectada) se conservan.
+        """
+        scanned_roots = [os.path.abspath(p) + os.sep for p in invoice_paths]
+        kept = {path: entry for path, entry in manifest.items()
+                if not any(path.startswith(root) for root in scanned_roots)}
+        kept.update(seen)
+        atomic_write_json(manifest_file, kept)
+
 
     # ==== 
     # SECCIÓN PARA CONFIRMAR EL ESTATUS DE LAS FACTURAS
@@ -289,12 +452,14 @@ class FACTURAS:
                 print(f"⚠️  Carpeta inexistente: {d}")
                 continue
             count = 0
-            # rglob es recursivo: busca en subcarpetas (ej. "08 Agosto\...")
-            for pdf in d.rglob("*.pdf"):
-                pdf_index.append((pdf.name.lower(), str(pdf)))
+            # Recursivo: busca en subcarpetas (ej. "08 Agosto\..."), listando solo las que cambiaron
+            for pdf in self.walker.files(str(d), '.pdf'):
+                pdf_index.append((os.path.basename(pdf).lower(), pdf))
                 count += 1
             total_indexed += count
             print(f"   → {count} PDFs indexados bajo {d}")
+        self.walker.save()
+        self.walker.print_stats()
 
         print(f"🔎 Total PDFs indexados: {total_indexed}")
 
@@ -307,32 +472,59 @@ class FACTURAS:
         for name, path in pdf_index[:min(5, len(pdf_index))]:
             print(f"   - {name}")
 
+        pdf_prefix_index = PdfPrefixIndex.load_or_build(
+            pdf_index, os.path.join(self.working_folder, ".cache", "pdf_index.json"))
+
         # --- Buscar por prefijo y copiar ---
         expected = len(pdf_files_list)
         found = 0
         not_found = []
         duplicates = {}
 
+        placements = []
+
         for raw_folio in pdf_files_list["Folio"].astype(str):
             folio = raw_folio.strip().lower()  # normalizar
-            matched_paths = [p for (name, p) in pdf_index if name.startswith(folio)]
+            matched_paths = pdf_prefix_index.lookup(folio)
 
             if matched_paths:
                 # Si hay más de uno, reportar duplicados y tomar el primero
                 if len(matched_paths) > 1:
                     duplicates[raw_folio] = matched_paths[:5]  # guarda hasta 5 para no saturar consola
 
-                src = matched_paths[0]
-                dst = os.path.join(invoice_temporal_files, f"{raw_folio}.pdf")
-                try:
-                    shutil.copy2(src, dst)
-                    print(f"✔ Copiado: {raw_folio} -> {dst}")
-                    found += 1
-                except Exception as e:
-                    print(f"❌ Error copiando {src} -> {dst}: {e}")
+                placements.append((raw_folio, matched_paths[0], os.path.join(invoice_temporal_files, f"{raw_folio}.pdf")))
             else:
                 not_found.append(raw_folio)
 
+        # Un folio repetido en la lista apunta al mismo destino: se coloca una sola vez
+        # (dos hilos sobre el mismo dst chocan), pero cada fila cuenta como encontrada
+        unique_placements = {}
+        for raw_folio, src, dst in placements:
+            key = os.path.normcase(os.path.abspath(dst))
+            if key in unique_placements:
+                unique_placements[key][3] += 1
+            else:
+                unique_placements[key] = [raw_folio, src, dst, 1]
+
+        # Colocar los PDFs (enlace duro, simbólico o copia) en paralelo: es I/O
+        mode = self.data_access.get('pdf_placement', 'hardlink')
+        methods = {}
+        with concurrent.futures.ThreadPoolExecutor(max_workers=8) as executor:
+            futures = {executor.submit(place_file, src, dst, mode): (raw_folio, src, dst, rows)
+                       for raw_folio, src, dst, rows in unique_placements.values()}
+            for future in concurrent.futures.as_completed(futures):
+                raw_folio, src, dst, rows = futures[future]
+                try:
+                    method = future.result()
+                    methods[method] = methods.get(method, 0) + 1
+                    if method != 'sin cambios':
+                        print(f"✔ Colocado ({method}): {raw_folio} -> {dst}")
+                    found += rows
+                except Exception as e:
+                    print(f"❌ Error colocando {src} -> {dst}: {e}")
+        if methods:
+            print("📎 Colocación de PDFs: " + ", ".join(f"{k}: {v}" for k, v in sorted(methods.items())))
+
         # --- Summary ---
         print("\n--- Resumen ---")
         print(f"Expected: {expected}")
@@ -347,9 +539,14 @@ class FACTURAS:
             print(f"Not found ({len(not_found)}): {not_found}")
         self.extract_estatus_pdf()
 
+    def _pdf_workers(self, n_files):
+        """Procesos para leer acuses según `pdf_workers` en config.yaml (entero o 'auto')."""
+        return worker_count(self.data_access.get('pdf_workers', 'auto'), n_files, 'pdf_workers')
+
     def extract_estatus_pdf(self):
         acuses_sat = os.path.join(self.working_folder, "Estatus SAT", "Comprobantes SAT")
         output_file = os.path.join(self.working_folder, "Estatus SAT", "estatus_facturas.xlsx")
+        cache_file = os.path.join(self.working_folder, ".cache", "acuses_sat.json")
 
         list_pdf_files = [f for f in os.listdir(acuses_sat) if f.lower().endswith(".pdf")]
 
@@ -357,46 +554,84 @@ class FACTURAS:
             print("❌ No se encontraron PDFs en:", acuses_sat)
             return
 
-        results = []
-
+        # Caché por contenido: {'files': nombre → tamaño/mtime/sha256, 'results': sha256 → uuid/estado}
+        cache = {'files': {}, 'results': {}}
+        if os.path.exists(cache_file):
+            try:
+                with open(cache_file, "r", encoding="utf-8") as f:
+                    cache = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"⚠️ No se pudo leer la caché de acuses: {e}")
+        cache.setdefault('files', {})
+        # Los errores de lectura no se guardan (se reintentan); se limpian los de cachés anteriores
+        cache['results'] = {sha: r for sha, r in cache.get('results', {}).items() if 'error' not in r}
+
+        hashes = {}
         for pdf_file in list_pdf_files:
             pdf_path = os.path.join(acuses_sat, pdf_file)
             try:
-                reader = PdfReader(pdf_path)
-                text = ""
-                for page in reader.pages:
-                    text += page.extract_text() or ""
-
-                # Normalizar texto
-                clean_text = text.replace("\n", " ").replace("\r", " ")
-
-                # Regex tolerante: capturar entre &id= y &re=
-                match = re.search(r"&id=([\s\S]+?)&re=", clean_text, re.IGNORECASE)
-                uuid = None
-                if match:
-                    uuid = match.group(1)
-                    # limpiar espacios intermedios
-                    uuid = uuid.replace(" ", "").replace("\n", "").replace("\r", "")
-
-                # Estado
-                if "Cancelado" in clean_text:
-                    estado = "Cancelado"
-                elif "Vigente" in clean_text:
-                    estado = "Vigente"
+                stat = os.stat(pdf_path)
+                known = cache['files'].get(pdf_file)
+                if known and known['size'] == stat.st_size and known['mtime_ns'] == stat.st_mtime_ns:
+                    hashes[pdf_file] = known['sha256']
                 else:
-                    estado = "Desconocido"
-
-                results.append({
-                    "uuid": uuid,
-                    "estado": estado,
-                    "filename": os.path.basename(pdf_file)
-                })
-
+                    hashes[pdf_file] = file_sha256(pdf_path)
+                    cache['files'][pdf_file] = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns,
+                                                'sha256': hashes[pdf_file]}
+            except OSError as e:
+                # PDF bloqueado (sincronización, antivirus) o ilegible: se omite en esta corrida
+                print(f"⚠️ No se pudo leer {pdf_file}, se omite: {e}")
+        list_pdf_files = [f for f in list_pdf_files if f in hashes]
+
+        # Un PDF repetido con otro nombre se lee una sola vez
+        pending = list({
+            hashes[f]: os.path.join(acuses_sat, f) for f in list_pdf_files if hashes[f] not in cache['results']
+        }.items())
+        print(f"📄 Acuses SAT: {len(list_pdf_files) - len(pending)} en caché, {len(pending)} por leer")
+
+        if pending:
+            workers = self._pdf_workers(len(pending))
+            paths = [path for _, path in pending]
+            if workers > 1:
+                executor = concurrent.futures.ProcessPoolExecutor(max_workers=workers)
+                results = executor.map(read_acuse_status, paths, chunksize=max(1, len(paths) // (workers * 4)))
+            else:
+                executor = None
+                results = map(read_acuse_status, paths)
+            try:
+                for i, ((sha, path), result) in enumerate(zip(pending, results), start=1):
+                    # Los errores no se guardan: el PDF se vuelve a intentar en la siguiente corrida
+                    if 'error' not in result:
+                        cache['results'][sha] = result
+                    # Guardado parcial: una corrida interrumpida conserva lo ya leído
+                    if i % PDF_CHECKPOINT_EVERY == 0:
+                        atomic_write_json(cache_file, cache)
+                        print(f"   … {i}/{len(pending)} acuses leídos")
+            finally:
+                if executor is not None:
+                    executor.shutdown()
+
+        # Olvidar archivos que ya no están en la carpeta
+        cache['files'] = {f: cache['files'][f] for f in list_pdf_files}
+        atomic_write_json(cache_file, cache)
+
+        # Mismas filas y orden que antes; los PDFs con error no generan fila
+        results = [
+            {**cache['results'][hashes[f]], "filename": os.path.basename(f)}
+            for f in list_pdf_files if hashes[f] in cache['results']
+        ]
+        df = pd.DataFrame(results, columns=["uuid", "estado", "filename"])
+
+        # Solo reescribir el Excel si el resultado cambió
+        if os.path.exists(output_file):
+            try:
+                # Ambos como texto y con vacíos como '' (None vs NaN no cuenta como cambio)
+                previous = pd.read_excel(output_file, dtype=str, keep_default_na=False)
+                if previous.equals(df.fillna('').astype(str)):
+                    print(f"✔️ {os.path.basename(output_file)} sin cambios ({len(df)} acuses)")
+                    return
             except Exception as e:
-                print(f"❌ Error procesando {pdf_file}: {e}")
-
-        # Guardar resultados
-        df = pd.DataFrame(results)
+                print(f"⚠️ No se pudo comparar con {os.path.basename(output_file)}: {e}")
         df.to_excel(output_file, index=False)
 
         print(f"✔ Resultados guardados en {output_file}")
@@ -1,9 +1,157 @@
+import io
+import os
+import json
+import hashlib
+import contextlib
+import concurrent.futures
 import pandas as pd
+from modules.excel_io import ExcelReader
+
+# Header row candidates in load_and_concat (skiprows 0 to 10)
+HEADER_SEARCH_ROWS = 11
+
+
+def file_sha256(file_path, chunk_size=65536):
+    """sha256 of a file's content, read in chunks."""
+    sha256 = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+def atomic_write_json(path, payload, indent=None):
+    """
+    Write payload as JSON through a temporary file and os.replace, so an
+    interrupted run never leaves a truncated file behind.
+    """
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_file = f"{path}.tmp"
+    with open(tmp_file, "w", encoding="utf-8") as f:
+        json.dump(payload, f, ensure_ascii=False, indent=indent)
+    os.replace(tmp_file, path)
+
+
+def worker_count(configured, n_items=None, setting='workers'):
+    """
+    Number of worker processes for a `*_workers` config value (int or 'auto' =
+    all cores), at least 1 and at most n_items when given. Invalid values fall
+    back to 1 (sequential).
+    """
+    if configured == 'auto':
+        configured = os.cpu_count() or 1
+    try:
+        configured = int(configured)
+    except (TypeError, ValueError):
+        print(f"⚠️ Invalid {setting} value: {configured}, running sequentially.")
+        configured = 1
+    if n_items is not None:
+        configured = min(configured, n_items)
+    return max(1, configured)
+
+
+def _read_section_entry_worker(helpers, name, file_path, sheet, rows):
+    # Messages are captured and printed by the caller so they keep entry order.
+    # ExcelCache counter changes are returned so a parent process can add them.
+    cache = helpers.excel_cache
+    before = cache.counters() if cache is not None else {}
+    with contextlib.redirect_stdout(io.StringIO()) as messages:
+        df = helpers._read_section_entry(name, file_path, sheet, rows)
+    delta = {k: v - before[k] for k, v in cache.counters().items()} if cache is not None else {}
+    return df, messages.getvalue(), delta
+
 
 class HELPERS:
-    @staticmethod
+    # Caché de datos de referencia por proceso:
+    # firma de la sección (nombres, rutas, hojas, columnas) -> (firma de archivos, DataFrame)
+    _reference_cache = {}
+
+    def __init__(self, excel_cache=None, load_workers=1, excel_reader=None):
+        # ExcelCache opcional compartido por todas las etapas que reciben HELPERS
+        self.excel_cache = excel_cache
+        # Motor de lectura de Excel (excel_reader en config.yaml)
+        self.excel_reader = excel_reader or ExcelReader()
+        # Procesos para leer los libros de una sección en load_and_concat (entero o 'auto')
+        self.load_workers = load_workers
+
+    def read_excel(self, path, sheet_name=0, header=0, **kwargs) -> pd.DataFrame:
+        kwargs.setdefault("engine", self.excel_reader.engine_for(path))
+        if self.excel_cache is not None:
+            return self.excel_cache.read_excel(path, sheet_name=sheet_name, header=header, **kwargs)
+        return pd.read_excel(path, sheet_name=sheet_name, header=header, **kwargs)
+
+    def sheet_names(self, path) -> list:
+        if self.excel_cache is not None:
+            return self.excel_cache.sheet_names(path)
+        return self.excel_reader.sheet_names(path)
+
+    def print_cache_stats(self):
+        if self.excel_cache is not None:
+            self.excel_cache.print_stats()
+
+    def _read_section_entry(self, name, file_path, sheet, rows) -> pd.DataFrame:
+        """
+        Read one config entry: find the header row from a single read of the
+        top HEADER_SEARCH_ROWS rows, then parse only the requested columns.
+        Without ExcelCache the workbook is opened once for both reads.
+        """
+        xls = self.excel_reader.excel_file(file_path) if self.excel_cache is None else None
+
+        def read(**kwargs):
+            if xls is not None:
+                return pd.read_excel(xls, sheet_name=sheet, **kwargs)
+            return self.read_excel(file_path, sheet_name=sheet, **kwargs)
+
+        try:
+            header_row = None
+            if rows:
+                try:
+                    top = read(header=None, nrows=HEADER_SEARCH_ROWS)
+                    for skip, values in enumerate(top.itertuples(index=False, name=None)):
+                        if all(col in values for col in rows):
+                            header_row = skip
+                            break
+                except Exception as e:
+                    print(f"⚠️ Error reading header rows for {name}: {e}")
+
+            if header_row is None:
+                if rows:
+                    print(f"⚠️ Could not find matching columns {rows} in first 10 rows for {name}, loading with skiprows=0")
+                return read()
+
+            try:
+                return read(skiprows=header_row, usecols=list(rows))
+            except ValueError:
+                # e.g. duplicated header names: read every column and select afterwards
+                return read(skiprows=header_row)
+        finally:
+            if xls is not None:
+                xls.close()
+
+    def _read_section_entries(self, entries):
+        """
+        Read (name, file_path, sheet, rows) entries, in worker processes when
+        load_workers allows it. Yields (df, messages) in entry order.
+        """
+        workers = self._load_workers(len(entries))
+        if workers == 1:
+            for entry in entries:
+                # Same process: the cache counters are already up to date
+                df, messages, _ = _read_section_entry_worker(self, *entry)
+                yield df, messages
+            return
+        print(f"⚙️ Loading {len(entries)} workbooks in {workers} processes")
+        with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+            for df, messages, cache_delta in executor.map(
+                    _read_section_entry_worker, [self] * len(entries), *zip(*entries)):
+                if self.excel_cache is not None:
+                    self.excel_cache.add_counters(cache_delta)
+                yield df, messages
 
-    def load_and_concat(config_section: dict) -> pd.DataFrame:
+    def _load_workers(self, n_entries):
+        return worker_count(self.load_workers, n_entries, 'load_workers')
+
+    def load_and_concat(self, config_section: dict) -> pd.DataFrame:
         """
         Load and concatenate DataFrames from a config section.
         Concatenates by column **position**, ignoring column names,
@@ -13,6 +161,7 @@ class HELPERS:
         standard_cols = None
         original_names = None
 
+        entries = []
         for name, cfg in config_section.items():
             file_path = cfg.get("file_path")
             sheet = cfg.get("sheet")
@@ -21,23 +170,10 @@ class HELPERS:
             if not file_path or not sheet:
                 print(f"⚠️ Skipping {name}, missing file_path or sheet")
                 continue
+            entries.append((name, file_path, sheet, rows))
 
-            # Try to find the header row by checking first 10 rows
-            df = None
-            for skip in range(11):  # 0 to 10
-                try:
-                    temp_df = pd.read_excel(file_path, sheet_name=sheet, skiprows=skip, nrows=0)  # Read headers only
-                    if all(col in temp_df.columns for col in rows):
-                        df = pd.read_excel(file_path, sheet_name=sheet, skiprows=skip)
-                        #print(f"✅ Header found at skiprows={skip} for {name}")
-                        break
-                except Exception as e:
-                    print(f"⚠️ Error reading with skiprows={skip} for {name}: {e}")
-                    continue
-            else:
-                print(f"⚠️ Could not find matching columns {rows} in first 10 rows for {name}, loading with skiprows=0")
-                df = pd.read_excel(file_path, sheet_name=sheet)
-
+        for (name, file_path, sheet, rows), (df, messages) in zip(entries, self._read_section_entries(entries)):
+            print(messages, end="")
             print(f"Loaded df for {name}: shape={df.shape}, columns={list(df.columns)}")
 
             # Keep only requested columns
@@ -75,3 +211,84 @@ class HELPERS:
         else:
             print("⚠️ No dataframes loaded.")
             return pd.DataFrame()
+
+    @staticmethod
+    def files_signature(config_section: dict) -> tuple:
+        """Ruta, tamaño y mtime de cada archivo de la sección (None si no existe)."""
+        signature = []
+        for name, cfg in config_section.items():
+            file_path = cfg.get("file_path")
+            try:
+                stat = os.stat(file_path)
+                signature.append((name, os.path.abspath(file_path), stat.st_size, stat.st_mtime_ns))
+            except (OSError, TypeError):
+                signature.append((name, file_path, None, None))
+        return tuple(signature)
+
+    def load_reference(self, config_section: dict) -> pd.DataFrame:
+        """
+        Igual que load_and_concat, pero carga cada sección una sola vez por proceso.
+        Si cambia la ruta, el tamaño o el mtime de algún archivo, se vuelve a cargar.
+        Devuelve siempre una copia para que el llamador pueda modificarla.
+        """
+        if not config_section:
+            return self.load_and_concat(config_section or {})
+
+        section_key = tuple(
+            (name, cfg.get("file_path"), cfg.get("sheet"), tuple(cfg.get("rows") or ()))
+            for name, cfg in config_section.items()
+        )
+        files_signature = self.files_signature(config_section)
+
+        cached = self._reference_cache.get(section_key)
+        if cached is not None and cached[0] == files_signature:
+            print(f"♻️ Datos de referencia en caché: {', '.join(config_section.keys())}")
+            return cached[1].copy()
+
+        df = self.load_and_concat(config_section)
+        self._reference_cache[section_key] = (files_signature, df)
+        return df.copy()
+
+    @staticmethod
+    def parquet_available() -> bool:
+        try:
+            import pyarrow  # noqa: F401
+            return True
+        except ImportError:
+            return False
+
+    @staticmethod
+    def parquet_sheet_path(xlsx_path: str, sheet: str) -> str:
+        """
+        Ruta de la copia Parquet de una hoja de un libro:
+        <carpeta>/parquet/<nombre del libro>/<hoja>.parquet
+        """
+        folder, file_name = os.path.split(xlsx_path)
+        dataset = os.path.splitext(file_name)[0]
+        return os.path.join(folder, "parquet", dataset, f"{sheet}.parquet")
+
+    @staticmethod
+    def to_parquet_safe(df: pd.DataFrame, parquet_path: str) -> bool:
+        """
+        Guarda df en Parquet de forma atómica. Si hay columnas object con tipos
+        mezclados (p. ej. números y 'no localizado'), se guardan como texto.
+        Devuelve False si no se pudo escribir (el Excel sigue siendo la fuente).
+        """
+        os.makedirs(os.path.dirname(parquet_path), exist_ok=True)
+        tmp_path = f"{parquet_path}.tmp"
+        safe_df = df.copy()
+        safe_df.columns = [str(c) for c in safe_df.columns]
+        try:
+            try:
+                safe_df.to_parquet(tmp_path, index=False)
+            except Exception:
+                for col in safe_df.columns[safe_df.dtypes == object]:
+                    safe_df[col] = safe_df[col].where(safe_df[col].isna(), safe_df[col].astype(str))
+                safe_df.to_parquet(tmp_path, index=False)
+            os.replace(tmp_path, parquet_path)
+            return True
+        except Exception as e:
+            print(f"⚠️ No se pudo guardar la copia Parquet {os.path.basename(parquet_path)}: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return False
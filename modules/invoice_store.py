@@ -0,0 +1,114 @@
+import os
+import sqlite3
+import datetime
+import pandas as pd
+from modules.excel_io import ExcelOutput
+
+
+class InvoiceStore:
+    """
+    Base SQLite de conceptos extraídos de los CFDI (antes xmls_extraidos.xlsx).
+
+    Solo se agregan filas: cada concepto se identifica por la llave del
+    comprobante (UUID, o Folio|Archivo si no hay timbre) y su posición dentro
+    del XML, con índice único, así que volver a insertar un CFDI no duplica.
+    El xlsx queda como exportación opcional.
+    """
+
+    COLUMNS = ['UUID', 'Folio', 'Fecha', 'Nombre', 'Rfc', 'Descripcion', 'Cantidad', 'Importe', 'Archivo']
+
+    def __init__(self, db_path):
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self.db_path = db_path
+        with self._connect() as conn:
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS conceptos (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    doc_key TEXT NOT NULL,
+                    concepto_idx INTEGER NOT NULL,
+                    uuid TEXT,
+                    folio TEXT,
+                    fecha TEXT,
+                    nombre TEXT,
+                    rfc TEXT,
+                    descripcion TEXT,
+                    cantidad REAL,
+                    importe REAL,
+                    archivo TEXT,
+                    inserted_at TEXT
+                );
+                CREATE UNIQUE INDEX IF NOT EXISTS idx_conceptos_doc ON conceptos (doc_key, concepto_idx);
+                CREATE INDEX IF NOT EXISTS idx_conceptos_uuid ON conceptos (uuid);
+                CREATE INDEX IF NOT EXISTS idx_conceptos_folio_archivo ON conceptos (folio, archivo);
+            """)
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def count(self):
+        with self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM conceptos").fetchone()[0]
+
+    def known_keys(self):
+        """Conjuntos de UUID y (Folio, Archivo) ya registrados."""
+        with self._connect() as conn:
+            uuids = {u for (u,) in conn.execute("SELECT DISTINCT uuid FROM conceptos WHERE uuid IS NOT NULL")}
+            folios_files = set(conn.execute("SELECT DISTINCT folio, archivo FROM conceptos"))
+        return uuids, folios_files
+
+    @staticmethod
+    def _to_records(df):
+        df = df[InvoiceStore.COLUMNS].copy()
+        df = df.astype(object).where(df.notna(), None)
+        doc_key = [u if u else f"{f}|{a}" for u, f, a in zip(df['UUID'], df['Folio'], df['Archivo'])]
+        # Posición del concepto dentro de su comprobante
+        concepto_idx = pd.Series(doc_key).groupby(doc_key).cumcount().tolist()
+        now = datetime.datetime.now().isoformat(timespec='seconds')
+        for key, idx, row in zip(doc_key, concepto_idx, df.itertuples(index=False)):
+            cantidad = float(row.Cantidad) if row.Cantidad is not None else None
+            importe = float(row.Importe) if row.Importe is not None else None
+            yield (key, idx, row.UUID, row.Folio, None if row.Fecha is None else str(row.Fecha),
+                   row.Nombre, row.Rfc, row.Descripcion, cantidad, importe, row.Archivo, now)
+
+    def append(self, df):
+        """Inserta conceptos nuevos; devuelve cuántos se agregaron."""
+        if df.empty:
+            return 0
+        with self._connect() as conn:
+            before = conn.total_changes
+            conn.executemany(
+                "INSERT OR IGNORE INTO conceptos (doc_key, concepto_idx, uuid, folio, fecha, nombre, rfc, "
+                "descripcion, cantidad, importe, archivo, inserted_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                self._to_records(df),
+            )
+            return conn.total_changes - before
+
+    def read(self):
+        """Todos los conceptos con las columnas de xmls_extraidos.xlsx, en orden de inserción."""
+        with self._connect() as conn:
+            df = pd.read_sql_query(
+                "SELECT uuid, folio, fecha, nombre, rfc, descripcion, cantidad, importe, archivo "
+                "FROM conceptos ORDER BY id",
+                conn,
+            )
+        df.columns = self.COLUMNS
+        return df
+
+    def migrate_from_xlsx(self, xlsx_path):
+        """Carga el xlsx histórico la primera vez que se usa la base."""
+        if not os.path.exists(xlsx_path) or self.count() > 0:
+            return 0
+        print(f"📥 Migrando {os.path.basename(xlsx_path)} a {os.path.basename(self.db_path)}...")
+        df = pd.read_excel(xlsx_path)
+        missing = set(self.COLUMNS) - set(df.columns)
+        if missing:
+            print(f"⚠️ {os.path.basename(xlsx_path)} no tiene las columnas {sorted(missing)}, no se migra.")
+            return 0
+        inserted = self.append(df)
+        print(f"✅ {inserted} conceptos migrados")
+        return inserted
+
+    def export_xlsx(self, xlsx_path, excel_output=None):
+        df = self.read()
+        (excel_output or ExcelOutput()).write(xlsx_path, {"Sheet1": df})
+        print(f"💾 Exportados {len(df)} conceptos a {xlsx_path}")
@@ -15,6 +15,7 @@ from selenium.common.exceptions import TimeoutException, NoSuchElementException
 from io import StringIO
 import pandas as pd 
 import json 
+from modules.excel_io import ExcelOutput
 #Basado en SAI_MANAGEMENT
 class orders_management:
     def __init__(self, working_folder, web_driver_manager, data_access):
@@ -22,6 +23,7 @@ class orders_management:
         self.web_driver_manager = web_driver_manager
         self.data_access = data_access
         self.timeout = 30  # Agregar timeout para WebDriverWait
+        self.excel_output = ExcelOutput.from_config(data_access)
 
     def export_results(self, download_directory):
         """Extrae y exporta datos de la tabla de resultados para ambos sets sin input del usuario."""
@@ -197,7 +199,7 @@ class orders_management:
             if output_data:
                 final_output_df = pd.concat(output_data, ignore_index=True)
                 output_file_name = os.path.join(download_directory, f"{today_yyyy_mm_dd_hh} SAGI_{downloaded_set}.xlsx")
-                final_output_df.to_excel(output_file_name, index=False)
+                self.excel_output.write(output_file_name, {"Sheet1": final_output_df})
                 print(f"✅ Data for {downloaded_set} saved to {output_file_name}")
                 
                 # Comparar con páginas previas
@@ -0,0 +1,68 @@
+import os
+import json
+import bisect
+import hashlib
+from modules.helpers import atomic_write_json
+
+
+class PdfPrefixIndex:
+    """
+    Índice de PDFs por nombre (en minúsculas) ordenado, para buscar por prefijo
+    de folio con búsqueda binaria en lugar de recorrer toda la lista.
+
+    Las coincidencias se devuelven en el orden original del recorrido de
+    carpetas, así que el primer PDF elegido y el reporte de duplicados no
+    cambian. El índice se guarda en disco y se reutiliza mientras la lista de
+    PDFs sea la misma.
+    """
+
+    def __init__(self, names, paths, positions, signature=None):
+        self.names = names
+        self.paths = paths
+        self.positions = positions
+        self.signature = signature
+
+    @staticmethod
+    def _signature(entries):
+        sha1 = hashlib.sha1()
+        for name, path in entries:
+            sha1.update(f"{name}\t{path}\n".encode("utf-8"))
+        return sha1.hexdigest()
+
+    @classmethod
+    def build(cls, entries, signature=None):
+        """entries: [(nombre_en_minúsculas, ruta)] en orden de recorrido."""
+        order = sorted(range(len(entries)), key=lambda i: entries[i][0])
+        return cls([entries[i][0] for i in order], [entries[i][1] for i in order], order,
+                   signature or cls._signature(entries))
+
+    @classmethod
+    def load_or_build(cls, entries, cache_file):
+        signature = cls._signature(entries)
+        if os.path.exists(cache_file):
+            try:
+                with open(cache_file, "r", encoding="utf-8") as f:
+                    cached = json.load(f)
+                if cached.get('signature') == signature:
+                    print("♻️ Índice de PDFs sin cambios, se reutiliza")
+                    return cls(cached['names'], cached['paths'], cached['positions'], signature)
+            except (OSError, ValueError, KeyError) as e:
+                print(f"⚠️ No se pudo leer el índice de PDFs {os.path.basename(cache_file)}: {e}")
+
+        index = cls.build(entries, signature)
+        atomic_write_json(cache_file, {'signature': signature, 'names': index.names, 'paths': index.paths,
+                                       'positions': index.positions})
+        return index
+
+    def __len__(self):
+        return len(self.names)
+
+    def lookup(self, prefix):
+        """Rutas cuyo nombre empieza con prefix, en orden de recorrido."""
+        i = bisect.bisect_left(self.names, prefix)
+        hits = []
+        while i < len(self.names) and self.names[i].startswith(prefix):
+            hits.append((self.positions[i], self.paths[i]))
+            i += 1
+        hits.sort()
+        return [path for _, path in hits]
@@ -17,6 +17,7 @@ import time
 from io import StringIO
 import pandas as pd 
 import json 
+from modules.excel_io import ExcelOutput
 #Basado en SAI_MANAGEMENT
 class SAI_PROOF_OF_DELIVERY:
     def __init__(self, working_folder, web_driver_manager, data_access):
@@ -32,6 +33,7 @@ class SAI_PROOF_OF_DELIVERY:
         self.web_driver_manager = web_driver_manager
         self.data_access = data_access
         self.timeout = 30  # Agregar timeout para WebDriverWait
+        self.excel_output = ExcelOutput.from_config(data_access)
         self.SAGI_PROOF_DELIVERY = {
             "https://sistemas.insabi.gob.mx/contratos/login": [
                 {
@@ -403,7 +405,7 @@ class SAI_PROOF_OF_DELIVERY:
             if output_data:
                 final_output_df = pd.concat(output_data, ignore_index=True)
                 output_file_name = os.path.join(download_directory, f"{today_yyyy_mm_dd_hh} SAGI_{downloaded_set}.xlsx")
-                final_output_df.to_excel(output_file_name, index=False)
+                self.excel_output.write(output_file_name, {"Sheet1": final_output_df})
                 print(f"✅ Data for {downloaded_set} saved to {output_file_name}")
                 
                 # Comparar con páginas previas
@@ -9,12 +9,16 @@ import math
 from datetime import datetime
 from pandas._libs.missing import NAType
 from pandas._libs.tslibs.nattype import NaTType
+from modules.helpers import HELPERS
+from modules.excel_io import ExcelReader
 
 
 class SQL_CONNEXION_UPDATING:
-    def __init__(self, integration_path, data_access):
+    def __init__(self, integration_path, data_access, helpers=None):
         self.integration_path = integration_path
         self.data_access = data_access
+        self.helpers = helpers
+        self.excel_reader = helpers.excel_reader if helpers is not None else ExcelReader.from_config(data_access)
         # Create a DataIntegration instance to use its get_newest_file method
         #self.data_integration = DataIntegration(working_folder, data_access)
     
@@ -128,11 +132,22 @@ class SQL_CONNEXION_UPDATING:
 
         # Concatenar todos los df_altas de cada archivo
         df_list = []
+        use_parquet = HELPERS.parquet_available()
         for file in xlsx_files:
             try:
-                df = pd.read_excel(file, sheet_name=sheet_name, engine="openpyxl")
+                # Preferimos la copia Parquet de la integración si existe y no es más antigua que el Excel
+                parquet_file = HELPERS.parquet_sheet_path(file, sheet_name)
+                if use_parquet and os.path.exists(parquet_file) and os.path.getmtime(parquet_file) >= os.path.getmtime(file):
+                    df = pd.read_parquet(parquet_file)
+                    origin = "Parquet"
+                elif self.helpers is not None:
+                    df = self.helpers.read_excel(file, sheet_name=sheet_name)
+                    origin = "Excel"
+                else:
+                    df = self.excel_reader.read_excel(file, sheet_name=sheet_name)
+                    origin = "Excel"
                 df_list.append(df)
-                print(f"✅ Leído {sheet_name} de {os.path.basename(file)} con {len(df)} filas")
+                print(f"✅ Leído {sheet_name} de {os.path.basename(file)} ({origin}) con {len(df)} filas")
             except Exception as e:
                 print(f"⚠️ No se pudo leer 'df_altas' de {file}: {e}")
 
@@ -140,6 +155,9 @@ class SQL_CONNEXION_UPDATING:
             print("⚠️ Ninguna hoja 'df_altas' pudo ser cargada.")
             return
 
+        if self.helpers is not None:
+            self.helpers.print_cache_stats()
+
         df_altas = pd.concat(df_list, ignore_index=True)
         df_altas = df_altas.drop(columns=drop_columns, errors='ignore')
         df_altas = df_altas.loc[:, ~df_altas.columns.str.contains("^Unnamed", case=False)]